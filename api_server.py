@@ -0,0 +1,87 @@
+# api_server.py
+# 本地 HTTP/JSON 查询服务，供脚本、Notebook 等非浏览器客户端调用：
+#   python api_server.py --port 8600
+#   GET  /queries                              可用查询及参数
+#   GET  /query/top_songs?n=10&by=listeners    单个查询
+#   GET  /metrics                              各 Streamlit 进程的会话内存与 RSS 指标
+#   POST /batch  {"queries": [{"name": "cluster_summary", "params": {"k": 4}}, ...]}
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+from utils import query_api
+
+# 批量查询的最大条数
+MAX_BATCH = 100
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/queries":
+            self._send(200, {name: sorted(types) for name, (_, _, types) in query_api.QUERIES.items()})
+            return
+        if url.path == "/metrics":
+            # 延迟导入：指标由各 Streamlit 进程写出，这里只汇总读取
+            from utils.session_memory import all_process_metrics
+            self._send(200, {str(pid): metrics for pid, metrics in all_process_metrics().items()})
+            return
+        if url.path.startswith("/query/"):
+            name = url.path[len("/query/"):]
+            try:
+                self._send(200, query_api.query(name, dict(parse_qsl(url.query))))
+            except query_api.QueryError as e:
+                self._send(400, {"error": str(e)})
+            except TimeoutError as e:
+                self._send(504, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": f"查询执行失败: {e}"})
+            return
+        self._send(404, {"error": f"未知路径: {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/batch":
+            self._send(404, {"error": f"未知路径: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            queries = json.loads(self.rfile.read(length) or b"{}").get("queries", [])
+        except (ValueError, AttributeError):
+            self._send(400, {"error": "请求体应为 JSON: {\"queries\": [...]}"})
+            return
+        if not isinstance(queries, list) or len(queries) > MAX_BATCH:
+            self._send(400, {"error": f"queries 应为列表，且不超过 {MAX_BATCH} 条"})
+            return
+        self._send(200, {"results": query_api.batch(queries)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地分析查询服务")
+    parser.add_argument("--host", default="127.0.0.1", help="默认只监听本机")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    print(f"查询服务已启动: http://{args.host}:{args.port}/queries")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
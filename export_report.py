@@ -0,0 +1,146 @@
+# export_report.py
+# 离线导出全部分析图表，无需打开浏览器：
+#   python export_report.py --out E:/Netease_analysis/report --formats png svg --workers 8
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import argparse
+import html
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+REPORT_DIR = "E:/Netease_analysis/report"
+
+
+def render_chart(key, out_dir, formats):
+    """
+    在子进程中计算并绘制一张图(matplotlib 每个进程单线程绘图)，返回 (key, {格式: 路径})
+    计算结果走磁盘缓存，已算过的数据直接复用
+    """
+    import matplotlib.pyplot as plt
+    from utils.charts import CHARTS
+
+    _, _, build = CHARTS[key]
+    fig = build()
+    paths = {}
+    if fig is None:
+        return key, paths
+
+    if hasattr(fig, "savefig"):
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{key}.{fmt}")
+            fig.savefig(path, format=fmt, dpi=150, bbox_inches="tight")
+            paths[fmt] = path
+        plt.close(fig)
+    else:
+        # plotly 图：HTML 片段始终导出；静态图依赖 kaleido，未安装时跳过
+        path = os.path.join(out_dir, f"{key}.html")
+        fig.write_html(path, include_plotlyjs="cdn", full_html=False)
+        paths["html"] = path
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{key}.{fmt}")
+            try:
+                fig.write_image(path, format=fmt)
+                paths[fmt] = path
+            except (ValueError, ImportError):
+                pass
+    return key, paths
+
+
+def export_all(out_dir=REPORT_DIR, formats=("png", "svg"), workers=None, keys=None):
+    """
+    并行导出 keys(默认全部)对应的图表，并生成合并的 report.html / report.pdf
+    返回 {key: {格式: 路径}}
+    """
+    from utils import artifact_graph
+    from utils.charts import CHARTS
+
+    os.makedirs(out_dir, exist_ok=True)
+    formats = list(formats)
+    if "png" not in formats:
+        formats.append("png")  # PDF 由 PNG 拼接
+    keys = list(keys or CHARTS)
+
+    # 先在主进程按依赖图重建全部过期的快照与缓存结果：SingleFlight 只在进程内合并，
+    # 若交给各子进程，共享同一结果的图表(如聚类与 K 值诊断)会各自重复计算；之后子进程只读缓存并绘图
+    status = artifact_graph.rebuild()
+    failed = [name for name, result in status.items() if result in ("failed", "skipped")]
+    if failed:
+        print(f"以下节点构建失败或被跳过，相关图表将在子进程中重试: {', '.join(failed)}")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_chart, key, out_dir, formats): key for key in keys}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                _, paths = future.result()
+                results[key] = paths
+            except Exception as e:
+                print(f"图表 {key} 导出失败: {e}")
+                results[key] = {}
+
+    ordered = {key: results.get(key, {}) for key in keys}
+    write_html_report(ordered, out_dir)
+    write_pdf_report(ordered, out_dir)
+    return ordered
+
+
+def write_html_report(results, out_dir):
+    from utils.charts import CHARTS
+
+    parts = [
+        "<html><head><meta charset='utf-8'><title>网易云用户行为分析报告</title></head><body>",
+        "<h1>网易云音乐用户行为分析报告</h1>",
+    ]
+    current_page = None
+    for key, paths in results.items():
+        page, title, _ = CHARTS[key]
+        if page != current_page:
+            parts.append(f"<h2>{html.escape(page)}</h2>")
+            current_page = page
+        parts.append(f"<h3>{html.escape(title)}</h3>")
+        if "svg" in paths:
+            parts.append(f"<img src='{os.path.basename(paths['svg'])}' style='max-width:100%'>")
+        elif "html" in paths:
+            with open(paths["html"], encoding="utf-8") as f:
+                parts.append(f.read())
+        elif "png" in paths:
+            parts.append(f"<img src='{os.path.basename(paths['png'])}' style='max-width:100%'>")
+        else:
+            parts.append("<p>该图表导出失败或无可用数据。</p>")
+    parts.append("</body></html>")
+
+    path = os.path.join(out_dir, "report.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return path
+
+
+def write_pdf_report(results, out_dir):
+    from PIL import Image
+
+    images = [Image.open(paths["png"]).convert("RGB") for paths in results.values() if "png" in paths]
+    if not images:
+        return None
+    path = os.path.join(out_dir, "report.pdf")
+    images[0].save(path, save_all=True, append_images=images[1:])
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出全部分析图表及合并报告")
+    parser.add_argument("--out", default=REPORT_DIR, help="输出目录")
+    parser.add_argument("--formats", nargs="+", default=["png", "svg"], choices=["png", "svg"])
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为 CPU 核数")
+    parser.add_argument("--charts", nargs="*", default=None, help="只导出指定图表 key")
+    args = parser.parse_args()
+
+    start = time.time()
+    results = export_all(args.out, args.formats, args.workers, args.charts)
+    ok = sum(1 for paths in results.values() if paths)
+    print(f"完成: {ok}/{len(results)} 张图表，耗时 {time.time() - start:.1f}s，输出目录 {args.out}")
+
+
+if __name__ == "__main__":
+    main()
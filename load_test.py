@@ -0,0 +1,290 @@
+# load_test.py
+# 多会话并发压测：用 Streamlit AppTest 在无浏览器的情况下模拟 N 个会话，
+# 依次执行 登录 -> 切换顶部导航各页面 -> 拖动滑块 / 切换渲染模式，统计各交互的延迟分位数及 CPU、RSS
+# AppTest 每次运行都会改写进程级的 Runtime 单例与全局配置，同一进程中并发的会话会互相干扰，
+# 因此每个会话在独立的(spawn)进程中运行；各进程仍共享同一份快照文件与磁盘缓存
+#   python load_test.py --user test --password 123 --sessions 1 4 16
+#   python load_test.py --user test --password 123 --scales 0.1 0.5 1.0 --sessions 1 8
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+REPORT_DIR = "E:/Netease_analysis/report"
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PAGES = ["主页", "用户画像", "社交互动", "歌单偏好", "播放行为", "我的"]
+CLUSTER_SLIDER_LABEL = "选择聚类个数 (K)"
+# 单次脚本运行的超时(秒)，冷启动时需要构建快照和缓存
+RUN_TIMEOUT = 600
+# 资源采样间隔(秒)，各会话进程的样本按该间隔对齐后相加
+SAMPLE_INTERVAL = 0.2
+
+
+def _timed(records, session, page, action, run, expect_content=False):
+    """
+    执行一次交互并记录延迟；脚本异常与页面中的 st.error 都记为错误
+    expect_content=True(切换页面)时页面没有渲染出标题也记为错误，
+    避免页面文件找不到等情况被当作“很快的成功”
+    """
+    start = time.perf_counter()
+    error = ""
+    try:
+        at = run()
+        if at.exception:
+            error = str(at.exception[0].message)
+        elif at.error:
+            error = str(at.error[0].value)
+        elif expect_content and not at.title:
+            error = "页面未渲染任何内容"
+    except Exception as e:
+        error = repr(e)
+    records.append({
+        "session": session,
+        "page": page,
+        "action": action,
+        "latency": time.perf_counter() - start,
+        "error": error,
+    })
+
+
+def run_session(session, user, password, rounds):
+    """
+    在独立进程中执行单个会话，返回 (交互记录, 资源样本 [(时间戳, CPU%, RSS字节)])
+    """
+    records = []
+    sampler = ResourceSampler()
+    sampler.start()
+    try:
+        _session_script(session, user, password, rounds, records)
+    finally:
+        sampler.stop()
+    return records, sampler.samples
+
+
+def _session_script(session, user, password, rounds, records):
+    """
+    单个会话的操作脚本。顶部导航是自定义组件，AppTest 无法点击，
+    这里与组件回传选中项时一样改写 session_state 中的 page / prev_menu
+    """
+    from streamlit.testing.v1 import AppTest
+    from utils.chart_view import CLIENT_MODE, SERVER_MODE
+
+    at = AppTest.from_file(APP_FILE, default_timeout=RUN_TIMEOUT)
+    _timed(records, session, "登录", "打开", at.run)
+
+    def login():
+        at.text_input[0].input(user)
+        at.text_input[1].input(password)
+        return at.button[0].click().run()
+
+    _timed(records, session, "登录", "提交", login)
+    if "logged_in" not in at.session_state or not at.session_state["logged_in"]:
+        raise RuntimeError(f"会话 {session} 登录失败，请检查 --user / --password")
+
+    for _ in range(rounds):
+        for page in PAGES:
+            def switch(page=page):
+                at.session_state["page"] = page
+                at.session_state["prev_menu"] = page
+                return at.run()
+
+            _timed(records, session, page, "切换页面", switch, expect_content=True)
+
+            if page == "主页":
+                for k in (4, 3):
+                    def change_k(k=k):
+                        slider = next(s for s in at.slider if s.label == CLUSTER_SLIDER_LABEL)
+                        return slider.set_value(k).run()
+
+                    _timed(records, session, page, f"滑块 K={k}", change_k)
+            elif page != "我的":
+                for mode in (SERVER_MODE, CLIENT_MODE):
+                    def change_mode(mode=mode):
+                        return at.radio(key="render_mode").set_value(mode).run()
+
+                    _timed(records, session, page, f"渲染模式 {mode}", change_mode)
+
+
+class ResourceSampler(threading.Thread):
+    """
+    后台定时采样本进程的 CPU 使用率与 RSS，样本为 (时间戳, CPU%, RSS字节)
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        from utils.session_memory import _rss_bytes
+
+        last_wall, last_cpu = time.perf_counter(), time.process_time()
+        while not self._stopped.wait(self.interval):
+            wall, cpu = time.perf_counter(), time.process_time()
+            cpu_pct = (cpu - last_cpu) / max(wall - last_wall, 1e-9) * 100
+            last_wall, last_cpu = wall, cpu
+            self.samples.append((time.time(), cpu_pct, _rss_bytes() or 0))
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_level(n_sessions, user, password, rounds):
+    """
+    以 n_sessions 个并发会话执行一轮压测，返回 (逐次交互记录, 资源统计)
+    每个会话一个 spawn 进程；CPU 与 RSS 为各会话进程在同一采样时刻的总和
+    没有任何页面成功渲染时抛出异常，不输出无意义的延迟
+    """
+    records, samples = [], []
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_sessions, mp_context=context) as pool:
+        futures = [pool.submit(run_session, i, user, password, rounds) for i in range(n_sessions)]
+        for future in futures:
+            session_records, session_samples = future.result()
+            records.extend(session_records)
+            samples.extend(session_samples)
+    wall = time.perf_counter() - start
+
+    rendered = [r for r in records if r["action"] == "切换页面" and not r["error"]]
+    if not rendered:
+        errors = sorted({r["error"] for r in records if r["error"]})
+        raise RuntimeError(f"没有任何页面成功渲染，压测结果无效: {errors[:3]}")
+
+    cpu = rss = None
+    if samples:
+        buckets = pd.DataFrame(samples, columns=["time", "cpu", "rss"])
+        buckets["slot"] = (buckets["time"] // SAMPLE_INTERVAL).astype(np.int64)
+        totals = buckets.groupby("slot")[["cpu", "rss"]].sum()
+        cpu, rss = totals["cpu"].to_numpy(), totals["rss"].to_numpy()
+    resources = {
+        "wall_seconds": wall,
+        "cpu_mean_pct": float(np.mean(cpu)) if cpu is not None else None,
+        "cpu_peak_pct": float(np.max(cpu)) if cpu is not None else None,
+        "rss_peak_mb": float(np.max(rss)) / 2**20 if rss is not None else None,
+    }
+    return records, resources
+
+
+def summarize(records):
+    """
+    按 (页面, 交互) 统计次数、错误数及 p50/p95/p99 延迟(秒)
+    """
+    df = pd.DataFrame(records)
+    rows = []
+    for (page, action), group in df.groupby(["page", "action"], sort=False):
+        latency = group["latency"].to_numpy()
+        p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+        rows.append({
+            "page": page,
+            "action": action,
+            "count": len(group),
+            "errors": int((group["error"] != "").sum()),
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        })
+    return pd.DataFrame(rows)
+
+
+def make_scaled_data(src_dir, dst_dir, fraction, seed=0):
+    """
+    按用户抽样生成缩放后的数据集：抽取 fraction 比例的 user_id，其余各表只保留这些用户的行
+    """
+    from utils.data_loader import TABLE_FILES, CSV_CHUNK_SIZE
+
+    os.makedirs(dst_dir, exist_ok=True)
+    basic = pd.read_csv(os.path.join(src_dir, TABLE_FILES["basic_info"]))
+    basic = basic.sample(frac=fraction, random_state=seed)
+    basic.to_csv(os.path.join(dst_dir, TABLE_FILES["basic_info"]), index=False)
+    user_ids = set(basic["user_id"])
+
+    for name, file_name in TABLE_FILES.items():
+        if name == "basic_info":
+            continue
+        dst = os.path.join(dst_dir, file_name)
+        header = True
+        for chunk in pd.read_csv(os.path.join(src_dir, file_name), chunksize=CSV_CHUNK_SIZE):
+            chunk[chunk["user_id"].isin(user_ids)].to_csv(dst, index=False, header=header,
+                                                         mode="w" if header else "a")
+            header = False
+    return dst_dir
+
+
+def run_scale(data_dir, args, isolated=False):
+    """
+    在子进程中针对一个数据目录执行全部并发级别(数据目录在导入时读取，需独立进程)
+    isolated=True(缩放数据集)时快照与磁盘缓存也放在该数据目录下：
+    快照发布时会按名称前缀删除其它版本，与生产数据共用目录会误删生产快照
+    """
+    env = dict(os.environ, NETEASE_DATA_DIR=data_dir)
+    if isolated:
+        env["NETEASE_SNAPSHOT_DIR"] = os.path.join(data_dir, "snapshot")
+        env["NETEASE_CACHE_DIR"] = os.path.join(data_dir, "cache")
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker",
+           "--user", args.user, "--password", args.password,
+           "--rounds", str(args.rounds), "--sessions", *map(str, args.sessions)]
+    out = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def worker(args):
+    results = []
+    for n in args.sessions:
+        records, resources = run_level(n, args.user, args.password, args.rounds)
+        results.append({"sessions": n, "summary": summarize(records).to_dict("records"), **resources})
+    print(json.dumps(results, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话并发压测")
+    parser.add_argument("--user", required=True, help="用于登录的已注册用户名")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 4, 16], help="并发会话数")
+    parser.add_argument("--rounds", type=int, default=1, help="每个会话遍历全部页面的轮数")
+    parser.add_argument("--scales", nargs="*", type=float, default=[1.0], help="数据集按用户抽样的比例")
+    parser.add_argument("--out", default=REPORT_DIR, help="结果输出目录")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    from utils.data_loader import DATA_DIR
+
+    os.makedirs(args.out, exist_ok=True)
+    rows = []
+    for scale in args.scales:
+        data_dir = DATA_DIR if scale >= 1.0 else make_scaled_data(
+            DATA_DIR, os.path.join(args.out, "load_test_data", f"scale_{scale:g}"), scale)
+        for level in run_scale(data_dir, args, isolated=scale < 1.0):
+            print(f"\n=== 数据比例 {scale:g} | 并发会话 {level['sessions']} | 耗时 {level['wall_seconds']:.1f}s | "
+                  f"CPU 均值 {level['cpu_mean_pct'] or 0:.0f}% 峰值 {level['cpu_peak_pct'] or 0:.0f}% | "
+                  f"RSS 峰值 {level['rss_peak_mb'] or 0:.0f} MB ===")
+            summary = pd.DataFrame(level["summary"])
+            print(summary.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+            for row in level["summary"]:
+                rows.append({"scale": scale, "sessions": level["sessions"], **row,
+                             "cpu_mean_pct": level["cpu_mean_pct"], "cpu_peak_pct": level["cpu_peak_pct"],
+                             "rss_peak_mb": level["rss_peak_mb"]})
+
+    path = os.path.join(args.out, "load_test.csv")
+    pd.DataFrame(rows).to_csv(path, index=False, encoding="utf-8-sig")
+    print(f"\n结果已写入 {path}")
+
+
+if __name__ == "__main__":
+    main()
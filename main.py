@@ -1,16 +1,12 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-# 需要 scikit-learn
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-import io
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
-
-# 设置 matplotlib 中文字体
-font_path = "E:/Netease_analysis/assets/SourceHanSansHWSC/OTF/SimplifiedChineseHW/SourceHanSansHWSC-Regular.otf"
-font_prop = font_manager.FontProperties(fname=font_path)
+from utils.user_features import load_user_features
+from utils.analytics import (K_RANGE, SILHOUETTE_SAMPLE, cluster_users, interpret_clusters, k_selection,
+                             recommended_k)
+from utils.charts import cluster_figure, k_selection_figure
+from utils.session_memory import show_figure
+from utils.chart_view import sample_caption, use_approx
+from utils import sample_store
 
 
 def render():
@@ -52,21 +48,36 @@ def render():
     st.markdown("---")
     st.markdown("## 🎨 用户聚类分布")
 
-    merged_df = load_and_merge_data()
-    if merged_df.empty:
-        st.warning("❓ 未获取到合并后的用户数据，可能 CSV 路径不正确或文件为空。")
-        return
-
-    # 选择 K 值
-    n_clusters = st.slider("选择聚类个数 (K)", min_value=2, max_value=6, value=3, step=1)
-
-    fig, labels = cluster_and_visualize(merged_df, n_clusters=n_clusters)
-    st.pyplot(fig)
+    # 近似模式：在分层抽样用户上加权聚类，不载入全量用户特征
+    approx = use_approx("home_cluster")
+    if not approx:
+        merged_df = load_and_merge_data()
+        if merged_df.empty:
+            st.warning("❓ 未获取到合并后的用户数据，可能 CSV 路径不正确或文件为空。")
+            return
+
+    # 选择 K 值：默认取扫描得到的推荐 K(结果按数据版本缓存)
+    selection = k_selection(K_RANGE[0], K_RANGE[1], SILHOUETTE_SAMPLE)
+    recommended = recommended_k()
+    n_clusters = st.slider("选择聚类个数 (K)", min_value=K_RANGE[0], max_value=K_RANGE[1],
+                           value=recommended, step=1)
+    with st.expander(f"📐 K 值诊断 (推荐 K={recommended})"):
+        show_figure(k_selection_figure(selection))
+        st.caption("惯性基于全量数据(手肘法)，轮廓系数基于按等级分层的抽样；推荐 K 为轮廓系数最大者。")
+
+    if approx:
+        labels, X_pca, cluster_summary_df = sample_store.cluster_users_estimate(n_clusters)
+    else:
+        labels, X_pca = cluster_users(n_clusters)
+    show_figure(cluster_figure(X_pca, labels, n_clusters))
 
     st.caption("此图使用K-means算法 + PCA降维。颜色=聚类分组，仅供参考。")
-
-    # ✅ 新增：展示各聚类在原始特征上的均值表
-    cluster_summary_df = interpret_clusters(merged_df, labels)
+    if approx:
+        sample_caption()
+        st.caption("近似模式下各聚类人数为抽样估计，user_count_low / user_count_high 为 95% 置信区间。")
+    else:
+        # ✅ 新增：展示各聚类在原始特征上的均值表
+        cluster_summary_df = interpret_clusters(merged_df, labels)
     st.markdown("### 各聚类平均特征值")
     st.dataframe(cluster_summary_df)
 
@@ -81,74 +92,9 @@ def render():
 
 
 def load_and_merge_data():
-    # 路径参考
     try:
-        basic = pd.read_csv("E:/Netease_analysis/data/basic_info.csv")
-        listen = pd.read_csv("E:/Netease_analysis/data/listening_records.csv")
-        playlist = pd.read_csv("E:/Netease_analysis/data/playlist_info.csv")
-        social = pd.read_csv("E:/Netease_analysis/data/social_info.csv")
+        return load_user_features()
     except Exception as e:
         st.error(f"读取CSV出错: {e}")
         return pd.DataFrame()
 
-    listen_agg = listen.groupby("user_id", as_index=False)["playCount"].sum()
-    listen_agg.rename(columns={"playCount": "total_plays"}, inplace=True)
-
-    merged = pd.merge(basic[["user_id", "level"]], listen_agg, on="user_id", how="left")
-    merged = pd.merge(merged, playlist[["user_id", "total_playlists"]], on="user_id", how="left")
-    merged = pd.merge(merged, social[["user_id", "fans_count", "follows_count"]], on="user_id", how="left")
-
-    for col in ["total_plays", "total_playlists", "fans_count", "follows_count", "level"]:
-        merged[col] = merged[col].fillna(0)
-
-    return merged
-
-
-def cluster_and_visualize(merged_df, n_clusters=3):
-    X = merged_df[["level", "total_plays", "total_playlists", "fans_count", "follows_count"]].values
-
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    labels = kmeans.fit_predict(X)
-
-    pca = PCA(n_components=2, random_state=42)
-    X_pca = pca.fit_transform(X)
-
-    fig, ax = plt.subplots(figsize=(8, 6))
-    scatter = ax.scatter(X_pca[:, 0], X_pca[:, 1], c=labels, cmap="rainbow", alpha=0.7)
-    ax.set_xlabel("PCA-1")
-    ax.set_ylabel("PCA-2")
-    ax.set_title(f"用户聚类结果 (K={n_clusters})", fontproperties=font_prop)
-
-
-    return fig, labels
-
-
-def interpret_clusters(merged_df, labels):
-    """
-    根据聚类结果 labels，对 merged_df 的 [level, total_plays, ...] 做 groupby 平均值。
-    返回一个 DataFrame：
-        cluster | level | total_plays | total_playlists | fans_count | follows_count | user_count
-    """
-    # 把 labels 写回 merged_df
-    temp_df = merged_df.copy()
-    temp_df["cluster"] = labels
-
-    # groupby 计算均值
-    # 注意：user_count 统计各簇人数
-    group_mean = temp_df.groupby("cluster", as_index=False).agg({
-        "user_id": "count",
-        "level": "mean",
-        "total_plays": "mean",
-        "total_playlists": "mean",
-        "fans_count": "mean",
-        "follows_count": "mean"
-    }).rename(columns={"user_id": "user_count"})
-
-    # 美化数值
-    # group_mean = group_mean.round(2)  # 若你想保留两位小数
-
-    # 让 cluster 列放在最左边
-    columns_order = ["cluster", "user_count", "level", "total_plays", "total_playlists", "fans_count", "follows_count"]
-    group_mean = group_mean[columns_order]
-
-    return group_mean
@@ -3,12 +3,15 @@ import streamlit as st
 import pandas as pd
 import os
 from PIL import Image
+from utils.disk_cache import disk_cached, invalidate_scope
+from utils.user_index import user_listening_records
+from utils.similar_users import similar_users
 
 
 USER_CSV_PATH = "E:/Netease_analysis/data/users.csv"
 AVATAR_FOLDER = "E:/Netease_analysis/assets/avatars"
 
-@st.cache_data
+@disk_cached(scope="users", sources=[USER_CSV_PATH], name="用户信息页.load_user_info")
 def load_user_info():
     if os.path.exists(USER_CSV_PATH):
         return pd.read_csv(USER_CSV_PATH, encoding='utf-8-sig')
@@ -26,9 +29,8 @@ def render():
 
     current_user = st.session_state["current_user"]
 
-    # 每次都加载最新 CSV
-    # 如果你想保留缓存，加 st.cache_data，但要在保存后 clear
-    df = load_user_info()
+    # 缓存键包含 users.csv 的大小和修改时间，文件一变就会重新读取
+    df = load_user_info().copy()
 
     user_row = df[df['username'] == current_user]
     if user_row.empty:
@@ -83,21 +85,58 @@ def render():
             df.at[idx, "intro"] = new_intro
             save_user_info(df)
 
-            # 2. 清理缓存 / 强制刷新
-            st.cache_data.clear()  # 清空之前 load_user_info() 缓存
+            # 2. 只清理用户信息作用域，分析数据缓存不受影响
+            invalidate_scope("users")
             st.success("✅ 信息已更新！")
-
-            st.cache_data.clear()  # 清空缓存
             st.rerun()
 
+    st.subheader("🔍 用户播放记录查询")
+    query_id = st.text_input("输入网易云 user_id 查看其播放记录", key="drilldown_user_id")
+    if query_id:
+        render_user_drilldown(query_id.strip())
+
     if st.button("🚪 退出登录", type="primary"):
         st.session_state["logged_in"] = False
         st.session_state["current_user"] = None
-        st.cache_data.clear()  # 如果有需要清理缓存
         st.session_state["page"] = "主页"
         st.stop()  # 或直接 return
 
 
+def render_user_drilldown(query_id):
+    """
+    单个用户的播放记录：走按 user_id 排序的索引，只读取该用户对应的连续行
+    """
+    try:
+        user_id = int(query_id)
+    except ValueError:
+        st.warning("user_id 应为数字。")
+        return
+
+    try:
+        records = user_listening_records(user_id)
+    except FileNotFoundError:
+        st.error("未找到播放记录数据文件。")
+        return
+
+    if records.empty:
+        st.info(f"用户 {user_id} 暂无播放记录。")
+    else:
+        c1, c2, c3 = st.columns(3)
+        c1.metric("播放记录数", len(records))
+        c2.metric("总播放次数", int(records["playCount"].sum()))
+        c3.metric("平均评分", f"{records['score'].mean():.2f}")
+        st.dataframe(records)
+
+    # 相似用户：基于等级、播放量、歌单数、粉丝数、关注数的标准化特征做最近邻检索
+    st.markdown("#### 🤝 与该用户相似的用户")
+    k = st.slider("相似用户个数", min_value=5, max_value=30, value=10, step=5, key="similar_k")
+    similar = similar_users(user_id, k=k)
+    if similar.empty:
+        st.info(f"用户 {user_id} 不在用户特征数据中。")
+    else:
+        st.dataframe(similar.drop(columns=["query_user_id"]))
+
+
 def format_phone_value(value):
     if pd.isna(value) or value == "暂无":
         return "暂无"
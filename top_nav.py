@@ -4,6 +4,8 @@ from streamlit_option_menu import option_menu
 from PIL import Image, ImageOps
 import os
 import importlib.util
+from utils.chart_view import approx_mode_selector, render_mode_selector
+from utils import session_memory, warmup
 
 
 def get_avatar():
@@ -153,10 +155,28 @@ def route_page(selected_page):
     page.render()
 
 
+def warmup_status():
+    """
+    侧边栏显示服务预热进度；预热未完成时页面仍可访问，只是首次计算较慢
+    """
+    status = warmup.readiness()
+    if not status["ready"]:
+        st.sidebar.progress(len(status["done"]) / status["total"],
+                            text=f"数据预热中 {len(status['done'])}/{status['total']}: {status['current'] or ''}")
+    elif status["failed"]:
+        with st.sidebar.expander(f"⚠️ 预热失败 {len(status['failed'])} 项"):
+            for label, error in status["failed"].items():
+                st.write(f"**{label}**")
+                st.code(error)
+
+
 def main_page():
     """
-    主入口：检查登录状态 -> 显示导航栏 -> 根据 page 进行路由
+    主入口：启动预热 -> 检查登录状态 -> 显示导航栏 -> 根据 page 进行路由
     """
+    # 服务启动后的第一次访问即开始后台预热，用户登录期间数据已在准备
+    warmup.start()
+
     if "logged_in" not in st.session_state:
         st.session_state["logged_in"] = False
     if not st.session_state["logged_in"]:
@@ -167,5 +187,12 @@ def main_page():
     if "page" not in st.session_state:
         st.session_state["page"] = "主页"
 
-    top_nav()
-    route_page(st.session_state["page"])
+    session_memory.begin_run()
+    try:
+        top_nav()
+        render_mode_selector()
+        approx_mode_selector()
+        warmup_status()
+        route_page(st.session_state["page"])
+    finally:
+        session_memory.end_run()
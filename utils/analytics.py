@@ -0,0 +1,476 @@
+# utils/analytics.py
+# 各分析页面的计算逻辑(不依赖 Streamlit)，页面渲染与离线导出共用
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter1d
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import r2_score, silhouette_score
+
+from utils.data_loader import BIRTHDAY_PLACEHOLDERS, USE_SNAPSHOT, add_time_buckets, load_table, table_path
+from utils.disk_cache import disk_cached
+from utils.user_features import DATA_FILES as FEATURE_FILES, FEATURE_COLUMNS, load_user_features
+from utils import mapreduce, song_dict
+
+GENDER_MAP = {0: "未知", 1: "男", 2: "女"}
+
+# 两位省份编码 -> 名称(用户画像)
+PROVINCE_CODE2_MAP = {
+    "11": "北京", "12": "天津", "13": "河北", "14": "山西", "15": "内蒙古",
+    "21": "辽宁", "22": "吉林", "23": "黑龙江", "31": "上海", "32": "江苏",
+    "33": "浙江", "34": "安徽", "35": "福建", "36": "江西", "37": "山东",
+    "41": "河南", "42": "湖北", "43": "湖南", "44": "广东", "45": "广西",
+    "46": "海南", "50": "重庆", "51": "四川", "52": "贵州", "53": "云南",
+    "54": "西藏", "61": "陕西", "62": "甘肃", "63": "青海", "64": "宁夏",
+    "65": "新疆", "71": "台湾", "81": "香港", "82": "澳门"
+}
+
+# 六位省份编码 -> 名称(歌单偏好)
+PROVINCE_MAP = {
+    110000: "北京", 120000: "天津", 130000: "河北", 140000: "山西", 150000: "内蒙古",
+    210000: "辽宁", 220000: "吉林", 230000: "黑龙江", 310000: "上海", 320000: "江苏",
+    330000: "浙江", 340000: "安徽", 350000: "福建", 360000: "江西", 370000: "山东",
+    410000: "河南", 420000: "湖北", 430000: "湖南", 440000: "广东", 450000: "广西",
+    460000: "海南", 500000: "重庆", 510000: "四川", 520000: "贵州", 530000: "云南",
+    540000: "西藏", 610000: "陕西", 620000: "甘肃", 630000: "青海", 640000: "宁夏",
+    650000: "新疆"
+}
+
+# 各页面读取的列(None 表示全部)
+PLAYLIST_PAGE_COLUMNS = {
+    "playlist_info": None,
+    "basic_info": ["user_id", "nickname", "gender", "province", "level"],
+    "social_info": ["user_id", "follows_count", "fans_count"],
+}
+SOCIAL_PAGE_COLUMNS = {
+    "basic_info": None,
+    "social_info": None,
+    "listening_records": ["user_id", "playCount"],
+    "playlist_info": ["user_id", "total_playlists"],
+}
+BEHAVIOUR_PAGE_COLUMNS = {
+    "listening_records": None,
+    "basic_info": ["user_id", "level"],
+    "social_info": ["user_id", "follows_count", "fans_count"],
+    "playlist_info": ["user_id", "liked_playlist_count", "created_playlist_count", "total_playlists"],
+}
+
+# 播放行为相关性分析字段及中文名
+CORR_RENAME_MAP = {
+    'playCount': '播放次数',
+    'score': '评分',
+    'liked_playlist_count': '点赞歌单数',
+    'created_playlist_count': '创建歌单数',
+    'total_playlists': '歌单总数',
+    'follows_count': '关注数',
+    'fans_count': '粉丝数',
+    'level': '等级'
+}
+
+
+# 自动选择 K 的扫描范围(含两端，默认与原滑块一致为 2-6)及轮廓系数的抽样规模(轮廓系数为 O(样本数²))
+K_RANGE = (int(os.environ.get("NETEASE_K_MIN", 2)), int(os.environ.get("NETEASE_K_MAX", 6)))
+SILHOUETTE_SAMPLE = int(os.environ.get("NETEASE_SILHOUETTE_SAMPLE", 5000))
+
+
+def _files(columns_map):
+    return [table_path(name) for name in columns_map]
+
+
+# ==========================
+# 主页：用户聚类
+# ==========================
+@disk_cached(scope="analytics", sources=FEATURE_FILES)
+def cluster_users(n_clusters=3):
+    """
+    K-means 聚类 + PCA 降维，返回 (labels, X_pca)
+    """
+    merged_df = load_user_features()
+    X = merged_df[FEATURE_COLUMNS].values
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    labels = kmeans.fit_predict(X)
+
+    pca = PCA(n_components=2, random_state=42)
+    X_pca = pca.fit_transform(X)
+    return labels, X_pca
+
+
+def _stratified_sample(strata, size, seed=42):
+    """
+    按 strata(如用户等级)分层抽样，各层按占比分配名额，至少保留 1 个，返回行号
+    """
+    n = len(strata)
+    if n <= size:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    _, codes = np.unique(strata, return_inverse=True)
+    counts = np.bincount(codes)
+    quota = np.maximum(1, np.round(counts * size / n)).astype(int)
+    picked = [rng.choice(np.flatnonzero(codes == c), quota[c], replace=False) for c in range(len(counts))]
+    return np.sort(np.concatenate(picked))
+
+
+def _score_k(X, sample, k):
+    """
+    单个 K 的评估：全量数据上的惯性(手肘法)，抽样上的轮廓系数
+    """
+    kmeans = KMeans(n_clusters=k, random_state=42)
+    labels = kmeans.fit_predict(X)
+    sample_labels = labels[sample]
+    if len(np.unique(sample_labels)) < 2:
+        silhouette = np.nan
+    else:
+        silhouette = silhouette_score(X[sample], sample_labels)
+    return k, kmeans.inertia_, silhouette
+
+
+@disk_cached(scope="analytics", sources=FEATURE_FILES)
+def k_selection(k_min=K_RANGE[0], k_max=K_RANGE[1], sample_size=SILHOUETTE_SAMPLE):
+    """
+    在 [k_min, k_max] 上并行扫描 K，返回
+        {"scores": DataFrame(k | inertia | silhouette), "recommended": 轮廓系数最大的 K, "elbow": 手肘点 K}
+    轮廓系数在按等级分层的抽样上计算，避免全量 O(n²)
+    """
+    merged_df = load_user_features()
+    X = merged_df[FEATURE_COLUMNS].values
+    sample = _stratified_sample(merged_df["level"].to_numpy(), sample_size)
+    ks = list(range(k_min, k_max + 1))
+
+    # 各 K 在线程池中并行：线程共享同一份 X，不需要逐个 K 序列化到子进程，
+    # 也不在 Web 进程中 fork；KMeans / 轮廓系数的计算在 Cython/BLAS 中释放 GIL
+    with ThreadPoolExecutor(max_workers=min(len(ks), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(lambda k: _score_k(X, sample, k), ks))
+    scores = pd.DataFrame(results, columns=["k", "inertia", "silhouette"])
+
+    # 手肘点：惯性曲线上距首尾连线最远的 K(两端先归一化)
+    inertia = scores["inertia"].to_numpy()
+    x = (scores["k"].to_numpy() - k_min) / max(k_max - k_min, 1)
+    y = (inertia - inertia.min()) / max(inertia.max() - inertia.min(), 1e-12)
+    elbow = int(scores["k"].iloc[np.argmax(np.abs(y - (1 - x)))])
+
+    if scores["silhouette"].notna().any():
+        recommended = int(scores.loc[scores["silhouette"].idxmax(), "k"])
+    else:
+        recommended = elbow
+    return {"scores": scores, "recommended": recommended, "elbow": elbow}
+
+
+def recommended_k():
+    """
+    当前 K_RANGE 下的推荐 K，并限制在 K_RANGE 内(滑块取值范围)
+    扫描范围与抽样规模显式传入，作为缓存键的一部分，环境变量变化后不会沿用旧范围的扫描结果
+    """
+    selection = k_selection(K_RANGE[0], K_RANGE[1], SILHOUETTE_SAMPLE)
+    return int(np.clip(selection["recommended"], K_RANGE[0], K_RANGE[1]))
+
+
+def interpret_clusters(merged_df, labels):
+    """
+    根据聚类结果 labels，对 merged_df 的 [level, total_plays, ...] 做 groupby 平均值。
+    返回一个 DataFrame：
+        cluster | level | total_plays | total_playlists | fans_count | follows_count | user_count
+    """
+    # 把 labels 写回 merged_df
+    temp_df = merged_df.copy()
+    temp_df["cluster"] = labels
+
+    # groupby 计算均值
+    # 注意：user_count 统计各簇人数
+    group_mean = temp_df.groupby("cluster", as_index=False).agg({
+        "user_id": "count",
+        "level": "mean",
+        "total_plays": "mean",
+        "total_playlists": "mean",
+        "fans_count": "mean",
+        "follows_count": "mean"
+    }).rename(columns={"user_id": "user_count"})
+
+    # 让 cluster 列放在最左边
+    columns_order = ["cluster", "user_count", "level", "total_plays", "total_playlists", "fans_count", "follows_count"]
+    return group_mean[columns_order]
+
+
+# ==========================
+# 用户画像
+# ==========================
+@disk_cached(scope="analytics", sources=[table_path("basic_info")], version=2)
+def _user_profile(current_year):
+    """
+    基础信息 + 省份名称(clean_province) + 生日日期 + 年龄(相对 current_year)
+    """
+    df = load_table("basic_info").copy()
+
+    def clean_province(code):
+        code_str = str(code)[:2]
+        return PROVINCE_CODE2_MAP.get(code_str, "未知地区")
+
+    df["clean_province"] = df["province"].apply(clean_province)
+
+    # 出生年份已在入库时换算为整数桶(直接读 CSV 时在这里补算)
+    if "birth_year" not in df.columns:
+        df = add_time_buckets(df)
+
+    # 生日时间戳转日期(占位值 1900-01-01 保留，-1 为缺失)
+    ts = pd.to_numeric(df["birthday"], errors="coerce")
+    birthday = pd.to_datetime(ts.where(~ts.isin(BIRTHDAY_PLACEHOLDERS)), unit="ms", errors="coerce")
+    birthday[ts == BIRTHDAY_PLACEHOLDERS[0]] = pd.Timestamp("1900-01-01")
+    df["birthday"] = birthday
+
+    # 年龄计算
+    df["age"] = (current_year - df["birth_year"]).where(df["birth_year"] > 1900)
+    return df
+
+
+def load_user_profile():
+    """
+    当前年份的用户画像；年份作为缓存参数，跨年后年龄随之重新计算，不会沿用旧缓存
+    """
+    return _user_profile(datetime.now().year)
+
+
+@disk_cached(scope="analytics", sources=[table_path("basic_info")])
+def level_counts():
+    return load_user_profile()['level'].value_counts().sort_index()
+
+
+@disk_cached(scope="analytics", sources=[table_path("basic_info")])
+def gender_counts():
+    return load_user_profile()['gender'].map(GENDER_MAP).value_counts()
+
+
+@disk_cached(scope="analytics", sources=[table_path("basic_info")])
+def province_counts():
+    df = load_user_profile()
+    counts = df["clean_province"].value_counts().drop("未知地区", errors='ignore')
+    province_df = counts.reset_index()
+    province_df.columns = ["省份", "用户数量"]
+    return province_df
+
+
+def valid_ages():
+    df = load_user_profile()
+    return df.loc[(df['age'] > 12) & (df['age'] < 80), 'age']
+
+
+def age_histogram(bins=15):
+    """
+    年龄直方图的聚合结果，返回 dict(counts, edges, peak_age)
+    """
+    return _age_histogram(datetime.now().year, bins)
+
+
+@disk_cached(scope="analytics", sources=[table_path("basic_info")])
+def _age_histogram(current_year, bins):
+    ages = valid_ages()
+    counts, edges = np.histogram(ages, bins=bins)
+    peak_age = ages.value_counts().idxmax() if len(ages) else None
+    return {"counts": counts, "edges": edges, "peak_age": peak_age}
+
+
+# ==========================
+# 社交互动
+# ==========================
+@disk_cached(scope="analytics", sources=_files(SOCIAL_PAGE_COLUMNS), version=2)
+def load_social_frame():
+    """
+    基础信息 + 社交 + 总播放量 + 歌单总数；基础信息或社交信息文件不存在时返回 None
+    读取/合并出错时直接抛出异常(不写入缓存)，由页面提示
+    """
+    if (not os.path.exists(table_path("basic_info"))) or (not os.path.exists(table_path("social_info"))):
+        return None
+
+    basic_df = load_table("basic_info", columns=SOCIAL_PAGE_COLUMNS["basic_info"])
+    social_df = load_table("social_info", columns=SOCIAL_PAGE_COLUMNS["social_info"])
+    if os.path.exists(table_path("listening_records")) and USE_SNAPSHOT:
+        # 与用户特征共用按用户分区的并行求和
+        listen_agg = mapreduce.run("user_plays")
+    elif os.path.exists(table_path("listening_records")):
+        listen_df = load_table("listening_records", columns=SOCIAL_PAGE_COLUMNS["listening_records"])
+        listen_agg = listen_df.groupby("user_id", as_index=False)["playCount"].sum()
+        listen_agg.rename(columns={"playCount": "total_plays"}, inplace=True)
+    else:
+        listen_agg = pd.DataFrame(columns=["user_id", "total_plays"])
+
+    if os.path.exists(table_path("playlist_info")):
+        playlist_df = load_table("playlist_info", columns=SOCIAL_PAGE_COLUMNS["playlist_info"])
+    else:
+        playlist_df = pd.DataFrame(columns=["user_id", "total_playlists"])
+
+    merged = pd.merge(basic_df, social_df, on="user_id", how="left")
+    if not listen_agg.empty:
+        merged = pd.merge(merged, listen_agg, on="user_id", how="left")
+
+    if "user_id" in playlist_df.columns and "total_playlists" in playlist_df.columns:
+        merged = pd.merge(merged, playlist_df[["user_id", "total_playlists"]], on="user_id", how="left")
+
+    for col in ["level", "fans_count", "follows_count", "total_plays", "total_playlists"]:
+        if col in merged.columns:
+            merged[col] = merged[col].fillna(0)
+
+    return merged
+
+
+@disk_cached(scope="analytics", sources=_files(SOCIAL_PAGE_COLUMNS))
+def fans_regression():
+    """
+    用等级、关注数线性回归预测粉丝数
+    返回 dict(y_test, y_pred, r2)；数据列不足时返回 None
+    """
+    df = load_social_frame()
+    if df is None:
+        return None
+    feats = [c for c in ["level", "follows_count"] if c in df.columns]
+    if ("fans_count" not in df.columns) or len(feats) < 1:
+        return None
+
+    sub = df.dropna(subset=["fans_count"] + feats)
+    X = sub[feats].values
+    y = sub["fans_count"].values
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, random_state=42, test_size=0.2)
+    model = LinearRegression()
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    return {"y_test": y_test, "y_pred": y_pred, "r2": r2_score(y_test, y_pred)}
+
+
+def parallel_categories_frame(df):
+    """
+    把等级、粉丝数、关注数分箱，地区、性别转为类别，供平行分类图使用
+    缺少必要列时返回 None
+    """
+    needed_cols = ["level", "fans_count", "follows_count", "province", "gender"]
+    for col in needed_cols:
+        if col not in df.columns:
+            return None
+
+    df_plot = df.copy()
+    df_plot["gender_cat"] = df_plot["gender"].map(GENDER_MAP).fillna("未知").astype(str)
+    df_plot["province_cat"] = df_plot["province"].astype(str)
+    df_plot["level_bin"] = pd.cut(df_plot["level"], bins=[-1,2,5,8,10, 999], labels=["Lv0-2","Lv3-5","Lv6-8","Lv9-10","Lv>10"])
+    df_plot["fans_bin"] = pd.cut(df_plot["fans_count"], bins=[-1,10,50,200,500, 1e9], labels=["粉丝0-10","粉丝11-50","粉丝51-200","粉丝201-500","粉丝500+"])
+    df_plot["follows_bin"] = pd.cut(df_plot["follows_count"], bins=[-1,10,50,200,500, 1e9], labels=["关注0-10","关注11-50","关注51-200","关注201-500","关注500+"])
+    return df_plot
+
+
+# ==========================
+# 歌单偏好
+# ==========================
+@disk_cached(scope="analytics", sources=_files(PLAYLIST_PAGE_COLUMNS))
+def load_playlist_frame():
+    """
+    歌单 + 基础信息 + 社交信息，附带 province_name
+    """
+    playlist = load_table("playlist_info", columns=PLAYLIST_PAGE_COLUMNS["playlist_info"])
+    basic = load_table("basic_info", columns=PLAYLIST_PAGE_COLUMNS["basic_info"])
+    social = load_table("social_info", columns=PLAYLIST_PAGE_COLUMNS["social_info"])
+
+    merged_df = pd.merge(playlist, basic, on="user_id", how="left")
+    merged_df = pd.merge(merged_df, social, on="user_id", how="left")
+    merged_df["province_name"] = merged_df["province"].map(PROVINCE_MAP)
+    return merged_df
+
+
+def level_playlist_fit(deg=2):
+    """
+    各等级平均歌单数及其多项式拟合曲线，返回 dict(x, y, x_fit, y_fit, deg)
+    """
+    merged_df = load_playlist_frame()
+    level_playlist = merged_df.groupby("level")["total_playlists"].mean().reset_index()
+    x = level_playlist["level"].values
+    y = level_playlist["total_playlists"].values
+    coeffs = np.polyfit(x, y, deg=deg)
+    poly_func = np.poly1d(coeffs)
+
+    x_fit = np.linspace(x.min(), x.max(), 100)
+    return {"x": x, "y": y, "x_fit": x_fit, "y_fit": poly_func(x_fit), "deg": deg}
+
+
+def province_playlist_top10():
+    merged_df = load_playlist_frame()
+    province_avg = merged_df.groupby("province_name")["total_playlists"].mean().dropna()
+    top10 = province_avg.sort_values(ascending=False).head(10).reset_index()
+    top10.columns = ["province_name", "avg_playlists"]
+    return top10
+
+
+# ==========================
+# 播放行为
+# ==========================
+def top_songs(n=20):
+    return song_dict.top_songs(n)
+
+
+def song_frequencies(max_words=200):
+    stats = song_dict.song_stats()
+    return stats.nlargest(max_words, "records").set_index("song_name")["records"].to_dict()
+
+
+def score_values():
+    return load_table("listening_records", columns=["score"])["score"]
+
+
+@disk_cached(scope="analytics", sources=[table_path("listening_records")])
+def score_density(points=256):
+    """
+    评分分布的分箱核密度估计：先分 points 个箱计数，再做高斯平滑
+    带宽按 Scott 规则(与 seaborn 默认一致)，返回 dict(x, density, mean)
+    使用快照时分两趟 map/reduce：先求计数、均值、标准差与极值，再在确定的区间上并行分箱
+    """
+    if USE_SNAPSHOT:
+        moments = mapreduce.run("score_moments")
+    else:
+        scores = score_values().dropna().to_numpy(dtype=np.float64)
+        moments = mapreduce.moments_of(scores)
+    if moments is None:
+        moments = mapreduce.ScoreMoments(0, np.nan, 0.0, np.nan, np.nan)
+    n = moments.count
+    if n < 2:
+        return {"x": np.array([]), "density": np.array([]), "mean": moments.mean}
+
+    bandwidth = moments.std * n ** (-1 / 5)
+    if bandwidth == 0:
+        bandwidth = 1.0
+    lo, hi = moments.minimum - 3 * bandwidth, moments.maximum + 3 * bandwidth
+    if USE_SNAPSHOT:
+        counts = mapreduce.run("score_histogram", lo=lo, hi=hi, points=points)
+    else:
+        counts, _ = np.histogram(scores, bins=points, range=(lo, hi))
+    edges = np.linspace(lo, hi, points + 1)
+    step = edges[1] - edges[0]
+    smoothed = gaussian_filter1d(counts.astype(np.float64), sigma=bandwidth / step, mode="constant")
+    density = smoothed / (n * step)
+    return {"x": (edges[:-1] + edges[1:]) / 2, "density": density, "mean": moments.mean}
+
+
+@disk_cached(scope="analytics", sources=_files(BEHAVIOUR_PAGE_COLUMNS))
+def behaviour_corr():
+    """
+    播放记录逐条关联歌单、社交、等级后的相关系数矩阵(中文列名)
+    使用快照时各分区在子进程中关联并累计成对的和，合并后一次算出相关系数，不在主进程展开整张关联表
+    """
+    user_tables = {name: BEHAVIOUR_PAGE_COLUMNS[name] for name in ["playlist_info", "social_info", "basic_info"]}
+    labels = list(CORR_RENAME_MAP.values())
+    if USE_SNAPSHOT:
+        sums = mapreduce.run("corr_sums", columns=list(CORR_RENAME_MAP), user_tables=user_tables)
+        matrix = sums.corr() if sums is not None else np.full((len(labels), len(labels)), np.nan)
+        return pd.DataFrame(matrix, index=labels, columns=labels)
+
+    listening_df = load_table("listening_records", columns=["user_id", "playCount", "score"])
+    playlist_df = load_table("playlist_info", columns=user_tables["playlist_info"])
+    social_df = load_table("social_info", columns=user_tables["social_info"])
+    basic_df = load_table("basic_info", columns=user_tables["basic_info"])
+
+    merged_df = pd.merge(listening_df, playlist_df, on='user_id', how='left')
+    merged_df = pd.merge(merged_df, social_df, on='user_id', how='left')
+    merged_df = pd.merge(merged_df, basic_df[['user_id', 'level']], on='user_id', how='left')
+
+    corr_df = merged_df[list(CORR_RENAME_MAP)].rename(columns=CORR_RENAME_MAP)
+    return corr_df.corr()
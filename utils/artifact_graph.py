@@ -0,0 +1,257 @@
+# utils/artifact_graph.py
+# 派生数据的依赖图：每个节点声明上游节点，节点版本直接取自它所对应的磁盘缓存 / 共享快照版本
+# (源文件内容摘要，见 disk_cache.source_digest)，源文件内容变化时只重建受影响的下游节点，
+# 按拓扑顺序执行，互不依赖的节点并行
+#   python -m utils.artifact_graph            # 重建过期节点
+#   python -m utils.artifact_graph --status   # 只查看各节点状态
+import os
+import json
+import time
+import argparse
+import threading
+import traceback
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import analytics, binning, cohorts, sample_store, snapshot, song_dict, user_index, similar_users
+from utils.data_loader import TABLE_FILES, USE_SNAPSHOT, attach_table, table_path
+from utils.disk_cache import CACHE_DIR
+
+STATE_PATH = os.path.join(CACHE_DIR, "artifact_graph.json")
+MAX_WORKERS = int(os.environ.get("NETEASE_GRAPH_WORKERS", 4))
+
+
+class Artifact(NamedTuple):
+    """
+    - build: 构建(或载入)节点的无参函数
+    - deps: 上游节点，只决定执行顺序
+    - version: 返回节点当前版本的无参函数；为 None 时 build 须为磁盘缓存函数，取其 cache_version
+    输入文件只在缓存 / 快照处声明一次(disk_cached 的 sources)，依赖图不再重复声明
+    """
+    name: str
+    build: object
+    deps: tuple = ()
+    page: str = "公共"
+    label: str = ""
+    version: object = None
+
+
+def _default_clusters():
+    analytics.cluster_users(analytics.recommended_k())
+
+
+def _snapshot_version(name):
+    return lambda: snapshot.source_version(table_path(name))
+
+
+def _cache_version(*funcs):
+    """
+    由若干磁盘缓存函数的版本组成的节点版本(节点 build 调用了多个缓存函数时使用)
+    """
+    return lambda: "-".join(func.cache_version() for func in funcs)
+
+
+def _if_snapshot(build):
+    """
+    共享快照与排序索引只在使用快照时构建；NETEASE_USE_SNAPSHOT=0 时这些节点为空操作
+    """
+    return lambda: build() if USE_SNAPSHOT else None
+
+
+def _snapshot(name):
+    return Artifact(f"snapshot:{name}", _if_snapshot(lambda: attach_table(name)), label=f"{name} 快照",
+                    version=_snapshot_version(name))
+
+
+NODES = {node.name: node for node in [
+    *[_snapshot(name) for name in TABLE_FILES],
+    Artifact("user_features", analytics.load_user_features,
+             deps=("snapshot:basic_info", "user_index", "snapshot:playlist_info", "snapshot:social_info"),
+             page="主页", label="用户特征"),
+    Artifact("k_selection", analytics.recommended_k, deps=("user_features",), page="主页", label="K 值扫描",
+             version=_cache_version(analytics.k_selection)),
+    Artifact("default_clusters", _default_clusters, deps=("k_selection",), page="主页", label="默认聚类",
+             version=_cache_version(analytics.cluster_users)),
+    Artifact("user_profile", lambda: (analytics.load_user_profile(), analytics.level_counts(),
+                                      analytics.gender_counts(), analytics.province_counts(),
+                                      analytics.age_histogram()),
+             deps=("snapshot:basic_info",), page="用户画像", label="用户画像统计",
+             version=_cache_version(analytics.level_counts, analytics.gender_counts, analytics.province_counts)),
+    Artifact("cohort_tables", cohorts.load_cohorts, deps=("snapshot:basic_info", "user_features"),
+             page="用户画像", label="时间分群表", version=_cache_version(cohorts.cohort_tables)),
+    Artifact("social_frame", analytics.load_social_frame,
+             deps=("snapshot:basic_info", "snapshot:social_info", "user_index", "snapshot:playlist_info"),
+             page="社交互动", label="社交数据"),
+    Artifact("fans_regression", analytics.fans_regression, deps=("social_frame",),
+             page="社交互动", label="粉丝数回归"),
+    Artifact("playlist_frame", analytics.load_playlist_frame,
+             deps=("snapshot:playlist_info", "snapshot:basic_info", "snapshot:social_info"),
+             page="歌单偏好", label="歌单数据"),
+    Artifact("density_grids", lambda: binning.density_grid(*binning.DEFAULT_PAIRS[0]), deps=("user_features",),
+             page="歌单偏好", label="二维分箱密度网格", version=_cache_version(binning.density_grids)),
+    Artifact("song_stats", song_dict.song_stats, deps=("user_index",), page="播放行为", label="歌曲聚合"),
+    Artifact("score_density", analytics.score_density, deps=("user_index",),
+             page="播放行为", label="评分密度"),
+    Artifact("behaviour_corr", analytics.behaviour_corr,
+             deps=("user_index", "snapshot:basic_info", "snapshot:social_info", "snapshot:playlist_info"),
+             page="播放行为", label="相关性矩阵"),
+    # 抽样在基础信息入库时完成，这里只按用户偏移从排序索引切出抽样用户的播放记录
+    Artifact("user_sample", sample_store.load_sample, deps=("snapshot:basic_info", "user_index"),
+             page="公共", label="近似模式分层抽样"),
+    Artifact("sample_frame", sample_store.social_frame_estimate,
+             deps=("user_sample", "snapshot:playlist_info", "snapshot:social_info"),
+             page="公共", label="抽样用户指标", version=_cache_version(sample_store.sample_frame,
+                                                                 sample_store.social_frame_estimate)),
+    Artifact("user_index", _if_snapshot(user_index.load_index), deps=("snapshot:listening_records",),
+             page="公共", label="按用户排序的播放索引(分区聚合与用户查询共用)",
+             version=_snapshot_version("listening_records")),
+    Artifact("similar_users", similar_users.build_index, deps=("user_features",),
+             page="我的", label="相似用户索引"),
+]}
+
+_state_lock = threading.Lock()
+
+
+def _load_state():
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"nodes": {}}
+
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = f"{STATE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def topological_order(names=None):
+    """
+    names(默认全部)及其全部上游节点的拓扑序
+    """
+    order, seen = [], set()
+
+    def visit(name, path=()):
+        if name in path:
+            raise ValueError(f"依赖图存在环: {' -> '.join(path + (name,))}")
+        if name in seen:
+            return
+        for dep in NODES[name].deps:
+            visit(dep, path + (name,))
+        seen.add(name)
+        order.append(name)
+
+    for name in names or NODES:
+        visit(name)
+    return order
+
+
+def fingerprints():
+    """
+    各节点的当前版本：与页面读取时磁盘缓存 / 快照使用的版本完全一致，
+    因此只 touch 而内容未变的源文件不会让任何节点过期；文件摘要有持久化记录，未变化时只有 stat 开销
+    """
+    result = {}
+    for name in topological_order():
+        node = NODES[name]
+        version = node.version or node.build.cache_version
+        result[name] = version()
+    return result
+
+
+def stale(names=None):
+    """
+    返回 (过期节点列表(拓扑序), 当前指纹)；只读取状态文件，不写入
+    """
+    built = _load_state()["nodes"]
+    current = fingerprints()
+    return [name for name in topological_order(names) if built.get(name) != current[name]], current
+
+
+def rebuild(names=None, force=False, workers=MAX_WORKERS, on_event=None):
+    """
+    重建 names(默认全部)中过期的节点；force=True 时全部执行(用于预热，缓存命中的节点很快)
+    某节点的上游全部完成后立即提交到线程池，互不依赖的节点并行执行；
+    计算密集的节点内部自行使用进程池(分区聚合、K 值扫描)
+    on_event(kind, node, detail) 回调 kind ∈ start / done / failed / skipped
+    返回 {节点: "built" | "fresh" | "failed" | "skipped"}
+    """
+    todo, current = stale(names)
+    if force:
+        todo = topological_order(names)
+    todo_set = set(todo)
+    status = {name: "fresh" for name in topological_order(names) if name not in todo_set}
+    emit = on_event or (lambda kind, node, detail=None: None)
+
+    def run(name):
+        emit("start", NODES[name])
+        NODES[name].build()
+        return name
+
+    pending = list(todo)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = NODES[name].deps
+                if any(status.get(dep) in ("failed", "skipped") for dep in deps):
+                    status[name] = "skipped"
+                    pending.remove(name)
+                    emit("skipped", NODES[name])
+                elif all(status.get(dep) in ("built", "fresh") for dep in deps):
+                    running[pool.submit(run, name)] = name
+                    pending.remove(name)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    status[name] = "built"
+                    emit("done", NODES[name])
+                except Exception:
+                    status[name] = "failed"
+                    emit("failed", NODES[name], traceback.format_exc(limit=3))
+
+    with _state_lock:
+        state = _load_state()
+        for name, result in status.items():
+            if result == "built":
+                state["nodes"][name] = current[name]
+        _save_state(state)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="派生数据依赖图")
+    parser.add_argument("nodes", nargs="*", help="只处理指定节点及其上游，默认全部")
+    parser.add_argument("--status", action="store_true", help="只显示状态，不重建")
+    parser.add_argument("--force", action="store_true", help="忽略指纹，全部重建")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    names = args.nodes or None
+    if args.status:
+        todo, _ = stale(names)
+        for name in topological_order(names):
+            node = NODES[name]
+            print(f"{'过期' if name in todo else '最新'}  {name:<20} <- {', '.join(node.deps) or '-'}")
+        return
+
+    def report(kind, node, detail=None):
+        print(f"[{time.strftime('%H:%M:%S')}] {kind:<7} {node.name}")
+        if detail:
+            print(detail)
+
+    status = rebuild(names, force=args.force, workers=args.workers, on_event=report)
+    built = sum(1 for s in status.values() if s == "built")
+    print(f"重建 {built} 个节点，{sum(1 for s in status.values() if s == 'fresh')} 个无需重建，"
+          f"{sum(1 for s in status.values() if s in ('failed', 'skipped'))} 个失败/跳过")
+
+
+if __name__ == "__main__":
+    main()
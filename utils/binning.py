@@ -0,0 +1,159 @@
+# utils/binning.py
+# 二维分箱引擎：对多组用户指标对一次性分块扫描，得到(对数刻度)二维计数网格及 Pearson 相关系数，
+# 结果按数据版本持久化，密度图只需渲染几十×几十的小数组，不再逐点 hexbin
+# 使用快照时逐批读取用户特征的派生 Arrow 快照，分箱范围取自快照元数据，峰值内存只与批大小有关
+import numpy as np
+from scipy.stats import t as t_dist
+
+from utils import snapshot
+from utils.data_loader import USE_SNAPSHOT
+from utils.disk_cache import disk_cached
+from utils.user_features import (DATA_FILES as FEATURE_FILES, FEATURE_COLUMNS, attach_user_features,
+                                 load_user_features)
+
+# 默认计算的指标对 (x, y)
+DEFAULT_PAIRS = [
+    ("total_playlists", "fans_count"),
+    ("follows_count", "fans_count"),
+    ("level", "total_plays"),
+]
+# 取值跨度很大的计数类指标用 log(1+x) 刻度分箱，等级等小整数按整数分箱
+LINEAR_METRICS = {"level"}
+METRIC_LABELS = {
+    "level": "等级",
+    "total_plays": "总播放次数",
+    "total_playlists": "歌单总数",
+    "fans_count": "粉丝数量",
+    "follows_count": "关注数",
+}
+DEFAULT_BINS = 40
+CHUNK_ROWS = 1_000_000
+
+
+class RunningMoments:
+    """
+    可分块累积、可合并的一阶/二阶矩(均值、离差平方和、协差)，用于计算 Pearson r
+    按块合并使用 Chan 等人的并行公式，避免 Σx² 直接相减的数值误差
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def update(self, x, y):
+        n_b = len(x)
+        if n_b == 0:
+            return
+        mean_xb, mean_yb = x.mean(), y.mean()
+        dx, dy = x - mean_xb, y - mean_yb
+        m2_xb, m2_yb, c_xyb = (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum()
+
+        n = self.n + n_b
+        delta_x, delta_y = mean_xb - self.mean_x, mean_yb - self.mean_y
+        factor = self.n * n_b / n
+        self.m2_x += m2_xb + delta_x * delta_x * factor
+        self.m2_y += m2_yb + delta_y * delta_y * factor
+        self.c_xy += c_xyb + delta_x * delta_y * factor
+        self.mean_x += delta_x * n_b / n
+        self.mean_y += delta_y * n_b / n
+        self.n = n
+
+    def pearson(self):
+        """
+        返回 (r, 双侧 p 值)；样本不足或方差为 0 时为 (nan, nan)
+        """
+        if self.n < 3 or self.m2_x <= 0 or self.m2_y <= 0:
+            return np.nan, np.nan
+        r = float(np.clip(self.c_xy / np.sqrt(self.m2_x * self.m2_y), -1.0, 1.0))
+        if abs(r) == 1.0:
+            return r, 0.0
+        t = r * np.sqrt((self.n - 2) / (1 - r * r))
+        return r, float(2 * t_dist.sf(abs(t), self.n - 2))
+
+
+def _edges(lo, hi, metric, bins):
+    """
+    每个指标的分箱边界(原始单位)及把取值映射为箱号的函数；lo / hi 为该指标的全局最小、最大值
+    """
+    if metric in LINEAR_METRICS:
+        edges = np.arange(np.floor(lo), np.floor(hi) + 2) - 0.5
+        n_bins = len(edges) - 1
+        return edges, lambda v: np.clip(np.floor(v - edges[0]).astype(np.int64), 0, n_bins - 1)
+
+    top = np.log1p(max(hi, 0.0)) or 1.0
+    width = top / bins
+    edges = np.expm1(np.linspace(0.0, top, bins + 1))
+    return edges, lambda v: np.clip((np.log1p(np.maximum(v, 0.0)) / width).astype(np.int64), 0, bins - 1)
+
+
+def _feature_chunks(metrics):
+    """
+    返回 ({指标: (最小值, 最大值)}, 数据块迭代器)，每个数据块为 {指标: float64 数组}
+    使用快照时范围取自各批 min/max 元数据，数据块即快照的 record batch(只映射，不整表载入)；
+    直接读 CSV 时退回整表特征按 CHUNK_ROWS 切块
+    """
+    if USE_SNAPSHOT:
+        features = attach_user_features()
+        ranges = {m: snapshot.column_range(features, m) for m in metrics}
+        table = snapshot.scan(features, metrics)
+        chunks = ({m: batch.column(m).to_numpy(zero_copy_only=False).astype(np.float64) for m in metrics}
+                  for batch in table.to_batches())
+        return ranges, chunks
+
+    df = load_user_features()
+    columns = {m: df[m].to_numpy(dtype=np.float64) for m in metrics}
+    ranges = {m: (float(np.nanmin(v)), float(np.nanmax(v))) for m, v in columns.items()}
+    chunks = ({m: v[start:start + CHUNK_ROWS] for m, v in columns.items()}
+              for start in range(0, len(df), CHUNK_ROWS))
+    return ranges, chunks
+
+
+@disk_cached(scope="analytics", sources=FEATURE_FILES, version=2)
+def density_grids(pairs=tuple(DEFAULT_PAIRS), bins=DEFAULT_BINS):
+    """
+    一次分块扫描用户特征，计算 pairs 中每个指标对的二维计数网格与相关系数，返回
+        {(x, y): {"counts", "xedges", "yedges", "x_log", "y_log", "n", "corr", "pval"}}
+    每个指标在每个数据块里只转换一次箱号，供所有包含它的指标对共享
+    """
+    metrics = sorted({m for pair in pairs for m in pair})
+    unknown = [m for m in metrics if m not in FEATURE_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支持的指标: {unknown}，可选: {FEATURE_COLUMNS}")
+
+    ranges, chunks = _feature_chunks(metrics)
+    binners = {m: _edges(*ranges[m], m, bins) for m in metrics}
+    shapes = {pair: (len(binners[pair[0]][0]) - 1, len(binners[pair[1]][0]) - 1) for pair in pairs}
+    counts = {pair: np.zeros(shapes[pair][0] * shapes[pair][1], dtype=np.int64) for pair in pairs}
+    moments = {pair: RunningMoments() for pair in pairs}
+
+    for chunk in chunks:
+        valid = {m: ~np.isnan(v) for m, v in chunk.items()}
+        index = {m: binners[m][1](np.nan_to_num(chunk[m])) for m in metrics}
+        for pair in pairs:
+            x, y = pair
+            ok = valid[x] & valid[y]
+            flat = index[x][ok] * shapes[pair][1] + index[y][ok]
+            counts[pair] += np.bincount(flat, minlength=len(counts[pair]))
+            moments[pair].update(chunk[x][ok], chunk[y][ok])
+
+    result = {}
+    for pair in pairs:
+        x, y = pair
+        corr, pval = moments[pair].pearson()
+        result[pair] = {
+            "counts": counts[pair].reshape(shapes[pair]).astype(np.int32),
+            "xedges": binners[x][0], "yedges": binners[y][0],
+            "x_log": x not in LINEAR_METRICS, "y_log": y not in LINEAR_METRICS,
+            "x": x, "y": y, "n": moments[pair].n, "corr": corr, "pval": pval,
+        }
+    return result
+
+
+def density_grid(x, y, bins=DEFAULT_BINS):
+    """
+    单个指标对的网格；默认指标对直接取批量结果，其它组合单独计算并缓存
+    """
+    pair = (x, y)
+    pairs = tuple(DEFAULT_PAIRS) if pair in DEFAULT_PAIRS else (pair,)
+    return density_grids(pairs, bins)[pair]
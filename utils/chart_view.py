@@ -0,0 +1,66 @@
+# utils/chart_view.py
+import streamlit as st
+
+from utils import sample_store
+from utils.session_memory import show_figure
+
+CLIENT_MODE = "客户端渲染 (Plotly)"
+SERVER_MODE = "服务端渲染 (Matplotlib)"
+RENDER_MODES = [CLIENT_MODE, SERVER_MODE]
+APPROX_KEY = "approx_mode"
+
+
+def render_mode_selector():
+    """
+    侧边栏切换图表渲染模式，默认客户端渲染
+    """
+    if "render_mode" not in st.session_state:
+        st.session_state["render_mode"] = CLIENT_MODE
+    st.sidebar.radio("图表渲染模式", RENDER_MODES, key="render_mode",
+                     help="客户端模式下服务端只计算聚合数据，由浏览器绘图；服务端模式输出 Matplotlib 图片")
+
+
+def approx_mode_selector():
+    """
+    侧边栏开关：近似模式下部分图表改用分层抽样估计，并显示置信区间
+    """
+    st.sidebar.checkbox("近似模式 (抽样估计)", key=APPROX_KEY,
+                        help="基于按等级和省份分层的用户抽样快速出图；每张图可单独点击“精确重算”")
+
+
+def use_approx(key):
+    """
+    图表 key 是否走近似计算：近似模式开启且该图表未被要求精确重算
+    近似时在图表上方显示“精确重算”按钮，点击后本会话中该图表改为全量精确计算
+    """
+    if not st.session_state.get(APPROX_KEY):
+        return False
+    exact_key = f"exact_{key}"
+    if st.session_state.get(exact_key):
+        return False
+    if st.button("🎯 精确重算", key=f"{exact_key}_button"):
+        st.session_state[exact_key] = True
+        st.rerun()
+    return True
+
+
+def sample_caption():
+    """
+    近似模式图表下方的抽样规模说明
+    """
+    info = sample_store.sample_info()
+    st.caption(f"近似模式: 基于 {info['strata']} 个(等级, 省份)分层中 {info['users']}/{info['population']} "
+               f"名抽样用户的 {info['records']} 条播放记录估计.")
+
+
+def show_chart(server, client=None):
+    """
+    按当前渲染模式展示图表：
+    - server: 无参函数，返回 matplotlib Figure(服务端绘制)
+    - client: 无参函数，返回基于聚合数据的 plotly 图；为 None 时总是走服务端
+    两者都是延迟调用，只计算所选模式需要的数据
+    """
+    if client is not None and st.session_state.get("render_mode", CLIENT_MODE) == CLIENT_MODE:
+        st.plotly_chart(client(), use_container_width=True)
+    else:
+        show_figure(server())
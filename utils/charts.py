@@ -0,0 +1,572 @@
+# utils/charts.py
+# 图表绘制：输入为 utils.analytics 的计算结果，输出 matplotlib / plotly 图对象
+# *_figure 为服务端 matplotlib 绘制(离线导出使用)；*_plotly 只接收聚合后的小数据，在浏览器端绘制
+import functools
+
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+import plotly.express as px
+import plotly.graph_objects as go
+from matplotlib.font_manager import FontProperties
+from wordcloud import WordCloud
+
+from utils import analytics, binning, cohorts
+from utils.binning import METRIC_LABELS
+
+# 中文字体
+FONT_PATH = "E:/Netease_analysis/assets/SourceHanSansHWSC/OTF/SimplifiedChineseHW/SourceHanSansHWSC-Regular.otf"
+font_prop = FontProperties(fname=FONT_PATH)
+
+plt.rcParams['font.sans-serif'] = ['SimHei']
+plt.rcParams['axes.unicode_minus'] = False
+
+
+def _source_han(func):
+    """
+    播放行为页的图表沿用原页面设置：font.family 为思源黑体；只在绘制该图时生效，不影响其它页面的 SimHei
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with plt.rc_context({"font.family": font_prop.get_name()}):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# ==========================
+# 主页
+# ==========================
+def cluster_figure(X_pca, labels, n_clusters):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.scatter(X_pca[:, 0], X_pca[:, 1], c=labels, cmap="rainbow", alpha=0.7)
+    ax.set_xlabel("PCA-1")
+    ax.set_ylabel("PCA-2")
+    ax.set_title(f"用户聚类结果 (K={n_clusters})", fontproperties=font_prop)
+    return fig
+
+
+def k_selection_figure(selection):
+    """
+    K 值诊断图：惯性(手肘法)与抽样轮廓系数随 K 的变化，标出推荐 K
+    """
+    scores = selection["scores"]
+    fig, ax1 = plt.subplots(figsize=(8, 4))
+    ax1.plot(scores["k"], scores["inertia"], "o-", color="steelblue", label="惯性")
+    ax1.set_xlabel("K")
+    ax1.set_ylabel("惯性 (Inertia)", fontproperties=font_prop)
+    ax2 = ax1.twinx()
+    ax2.plot(scores["k"], scores["silhouette"], "s--", color="darkorange", label="轮廓系数")
+    ax2.set_ylabel("轮廓系数 (Silhouette)", fontproperties=font_prop)
+    ax1.axvline(selection["recommended"], color="red", linestyle=":", alpha=0.7)
+    ax1.set_xticks(scores["k"])
+    ax1.set_title(f"K 值选择 (推荐 K={selection['recommended']}, 手肘点 K={selection['elbow']})",
+                  fontproperties=font_prop)
+    return fig
+
+
+# ==========================
+# 用户画像
+# ==========================
+def level_distribution_figure(level_counts):
+    fig, ax = plt.subplots()
+    sns.barplot(x=level_counts.index, y=level_counts.values, palette="Blues_d", ax=ax)
+    ax.set_xlabel("用户等级")
+    ax.set_ylabel("用户数量")
+    ax.set_title("等级分布图")
+    return fig
+
+
+def gender_pie_figure(gender_counts):
+    fig, ax = plt.subplots()
+    ax.pie(gender_counts, labels=gender_counts.index, autopct='%1.1f%%',
+           colors=['gray', 'skyblue', 'pink'], startangle=140)
+    ax.axis('equal')
+    return fig
+
+
+def province_bar_figure(province_df):
+    return px.bar(
+        province_df,
+        x="用户数量",
+        y="省份",
+        orientation="h",
+        color="用户数量",
+        color_continuous_scale="Blues",
+        height=600,
+        title="各省份用户分布（按人数排序）"
+    )
+
+
+def age_histogram_figure(ages):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.histplot(ages, bins=15, kde=True, color='#6fa8dc',
+                 edgecolor='white', line_kws={'lw': 1.5}, ax=ax)
+    ax.set_title('用户年龄分布特征', fontsize=14, pad=20)
+    ax.set_xlabel('年龄', fontsize=12)
+    ax.set_ylabel('用户数量', fontsize=12)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # 添加峰值年龄注释
+    peak_age = ages.value_counts().idxmax()
+    ax.axvline(peak_age, color='#e74c3c', linestyle='--', lw=1)
+    ax.text(peak_age + 1, ax.get_ylim()[1] * 0.9,
+            f'峰值年龄: {peak_age}岁', color='#e74c3c')
+    fig.tight_layout()
+    return fig
+
+
+def cohort_figure(labels, counts, mean, x_title, metric_title, title):
+    fig, ax = plt.subplots(figsize=(10, 4))
+    positions = np.arange(len(labels))
+    ax.bar(positions, counts, color="#6fa8dc")
+    ax.set_ylabel("用户数量", fontproperties=font_prop)
+    ax.set_xlabel(x_title, fontproperties=font_prop)
+    step = max(1, len(labels) // 12)
+    ax.set_xticks(positions[::step])
+    ax.set_xticklabels(labels[::step], rotation=45, ha="right")
+    if mean is not None:
+        ax2 = ax.twinx()
+        ax2.plot(positions, mean, "o-", color="#e74c3c", markersize=3)
+        ax2.set_ylabel(f"平均{metric_title}", fontproperties=font_prop)
+    ax.set_title(title, fontproperties=font_prop)
+    fig.tight_layout()
+    return fig
+
+
+def cohort_level_figure(table):
+    """
+    各账号年龄的等级构成：堆叠柱，每段为一个等级的人数(table 为 cohort_tables 的 account_age)
+    """
+    level_counts = table["level_counts"]
+    labels = [f"{age}年" for age in table["buckets"]]
+    fig, ax = plt.subplots(figsize=(10, 4))
+    positions = np.arange(len(labels))
+    bottom = np.zeros(len(labels))
+    colors = plt.cm.viridis(np.linspace(0, 1, level_counts.shape[1]))
+    for level in range(level_counts.shape[1]):
+        ax.bar(positions, level_counts[:, level], bottom=bottom, color=colors[level], label=f"Lv{level}")
+        bottom += level_counts[:, level]
+    ax.set_xticks(positions)
+    ax.set_xticklabels(labels)
+    ax.set_xlabel("账号年龄", fontproperties=font_prop)
+    ax.set_ylabel("用户数量", fontproperties=font_prop)
+    ax.set_title("各账号年龄的等级构成", fontproperties=font_prop)
+    ax.legend(ncol=2, fontsize=8, bbox_to_anchor=(1.01, 1), loc="upper left")
+    fig.tight_layout()
+    return fig
+
+
+# ==========================
+# 社交互动
+# ==========================
+def regression_figure(result):
+    if result is None:
+        fig, ax = plt.subplots()
+        ax.text(0.5, 0.5, "数据列不足: 无法回归粉丝数", ha="center", va="center")
+        return fig
+
+    y_test, y_pred = result["y_test"], result["y_pred"]
+    fig, ax = plt.subplots(figsize=(5, 4))
+    ax.scatter(y_test, y_pred, alpha=0.7, color="steelblue")
+    ax.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'r--')
+    ax.set_xlabel("实际粉丝数")
+    ax.set_ylabel("预测粉丝数")
+    ax.set_title(f"线性回归 - 预测粉丝数 ($R^2$={result['r2']:.3f})")
+    return fig
+
+
+PARALLEL_DIMENSIONS = ["level_bin", "fans_bin", "follows_bin", "province_cat", "gender_cat"]
+
+
+def parallel_categories_figure(df_plot, weight=None):
+    """
+    weight: 可选的权重列名(近似模式下为抽样权重)，流线粗细按权重之和而不是行数
+    """
+    if df_plot is None:
+        return None
+    if weight is None:
+        fig = px.parallel_categories(
+            df_plot,
+            dimensions=PARALLEL_DIMENSIONS,
+            color_continuous_scale=px.colors.sequential.Inferno
+        )
+        fig.update_layout(title="平行分类图: 用户社交多维分布")
+    else:
+        fig = go.Figure(go.Parcats(
+            dimensions=[{"label": d, "values": df_plot[d].astype(str)} for d in PARALLEL_DIMENSIONS],
+            counts=df_plot[weight].to_numpy(),
+        ))
+        fig.update_layout(title="平行分类图: 用户社交多维分布 (抽样加权估计)")
+    return fig
+
+
+# ==========================
+# 歌单偏好
+# ==========================
+def level_playlist_figure(fit):
+    fig, ax = plt.subplots()
+    # 原折线
+    ax.plot(fit["x"], fit["y"], marker="o", label="平均歌单数")
+    # 近似模式：各等级均值的 95% 置信区间
+    if "low" in fit:
+        ax.fill_between(fit["x"], fit["low"], fit["high"], alpha=0.2, label="95% 置信区间")
+    # 拟合线
+    ax.plot(fit["x_fit"], fit["y_fit"], "r--", label=f"多项式拟合(度={fit['deg']})")
+    ax.set_title("不同等级与歌单总数 (多项式曲线)")
+    ax.set_xlabel("用户等级")
+    ax.set_ylabel("平均歌单数量")
+    ax.legend()
+    return fig
+
+
+def province_treemap_figure(top10):
+    return px.treemap(
+        top10,
+        path=["province_name"],
+        values="avg_playlists",
+        color="avg_playlists",
+        color_continuous_scale="Tealgrn",
+        # 近似模式下悬停显示 95% 置信区间
+        hover_data=[c for c in ("low", "high") if c in top10.columns],
+        title="各省份人均歌单数量 Top10"
+    )
+
+
+def density_panel_figure(grid):
+    """
+    二维计数网格(utils/binning)的密度图，计数类指标用 symlog 坐标
+    """
+    counts = np.ma.masked_equal(grid["counts"], 0)  # 与 hexbin 的 mincnt=1 一致
+    fig, ax = plt.subplots(figsize=(6, 4))
+    mesh = ax.pcolormesh(grid["xedges"], grid["yedges"], counts.T, cmap="viridis")
+    if grid["x_log"]:
+        ax.set_xscale("symlog", linthresh=1)
+    if grid["y_log"]:
+        ax.set_yscale("symlog", linthresh=1)
+    ax.set_xlabel(METRIC_LABELS.get(grid["x"], grid["x"]), fontproperties=font_prop)
+    ax.set_ylabel(METRIC_LABELS.get(grid["y"], grid["y"]), fontproperties=font_prop)
+    ax.set_title(f"Pearson r={grid['corr']:.3f} (n={grid['n']})")
+    cb = fig.colorbar(mesh, ax=ax)
+    cb.set_label("计数", fontproperties=font_prop)
+    return fig
+
+
+# ==========================
+# 播放行为
+# ==========================
+@_source_han
+def top_songs_figure(top_songs):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bars = sns.barplot(y=top_songs.index, x=top_songs.values, palette="coolwarm", ax=ax)
+
+    ax.set_title("Top 20 热门歌曲", fontproperties=font_prop, fontsize=16)
+    ax.set_xlabel("播放次数", fontproperties=font_prop, fontsize=12)
+    ax.set_ylabel("歌曲名称", fontproperties=font_prop, fontsize=12)
+
+    for label in ax.get_yticklabels():
+        label.set_fontproperties(font_prop)
+        label.set_fontsize(10)
+    for label in ax.get_xticklabels():
+        label.set_fontproperties(font_prop)
+        label.set_fontsize(10)
+
+    for bar in bars.patches:
+        width = bar.get_width()
+        ax.text(
+            width + max(top_songs.values) * 0.01,
+            bar.get_y() + bar.get_height() / 2,
+            f'{int(width)}',
+            va='center',
+            ha='left',
+            fontproperties=font_prop,
+            fontsize=9,
+            color='black'
+        )
+
+    sns.despine(ax=ax, top=True, right=True)
+    return fig
+
+
+@_source_han
+def score_kde_figure(density):
+    """
+    评分分布曲线：直接绘制 analytics.score_density 的分箱核密度(按数据版本缓存)，不再对逐条评分做 KDE
+    """
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.fill_between(density["x"], density["density"], color="#FF7F0E", alpha=0.7)
+    ax.plot(density["x"], density["density"], color="#FF7F0E", linewidth=2)
+
+    mean_score = density["mean"]
+    if len(density["x"]) and np.isfinite(mean_score):
+        ax.axvline(mean_score, color='gray', linestyle='--', linewidth=1.5)
+        # 使用ASCII冒号, 避免方块
+        ax.text(
+            mean_score + 0.05,
+            ax.get_ylim()[1] * 0.9,
+            f'均值: {mean_score:.2f}',
+            color='gray',
+            fontsize=10,
+            fontproperties=font_prop
+        )
+
+    ax.set_title("用户评分分布曲线", fontproperties=font_prop, fontsize=18)
+    ax.set_xlabel("分数", fontproperties=font_prop, fontsize=14)
+    ax.set_ylabel("密度", fontproperties=font_prop, fontsize=14)
+
+    for label in ax.get_xticklabels() + ax.get_yticklabels():
+        label.set_fontproperties(font_prop)
+
+    fig.tight_layout()
+    return fig
+
+
+@_source_han
+def wordcloud_figure(frequencies):
+    wc = WordCloud(
+        font_path=FONT_PATH,
+        width=1000,
+        height=500,
+        background_color='white',
+        colormap='plasma',
+        collocations=False,
+        max_words=200,
+        contour_width=1,
+        contour_color='steelblue'
+    ).generate_from_frequencies(frequencies)
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.imshow(wc, interpolation='bilinear')
+    ax.axis('off')
+    return fig
+
+
+@_source_han
+def correlation_heatmap_figure(corr):
+    with sns.axes_style("whitegrid"):
+        fig, ax = plt.subplots(figsize=(10, 8))
+        sns.heatmap(
+            corr,
+            annot=True,
+            cmap='coolwarm',
+            linewidths=0.5,
+            fmt=".2f",
+            annot_kws={"size": 10},
+            square=True,
+            cbar_kws={"shrink": 0.75},
+            ax=ax
+        )
+    ax.set_title("播放行为相关性热力图", fontproperties=font_prop, fontsize=16)
+
+    # x,y 轴标签改成中文
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=30, ha='right', fontproperties=font_prop, fontsize=10)
+    ax.set_yticklabels(ax.get_yticklabels(), rotation=0, fontproperties=font_prop, fontsize=10)
+    return fig
+
+
+# ==========================
+# 客户端渲染(plotly)：服务端只传聚合结果
+# ==========================
+def level_distribution_plotly(level_counts):
+    fig = px.bar(x=level_counts.index, y=level_counts.values,
+                 labels={"x": "用户等级", "y": "用户数量"}, title="等级分布图",
+                 color_discrete_sequence=["#3d6fa8"])
+    fig.update_xaxes(type="category")
+    return fig
+
+
+def gender_pie_plotly(gender_counts):
+    color_map = {"未知": "gray", "男": "skyblue", "女": "pink"}
+    fig = px.pie(names=gender_counts.index, values=gender_counts.values,
+                 color=gender_counts.index, color_discrete_map=color_map)
+    fig.update_traces(textinfo="percent+label")
+    return fig
+
+
+def age_histogram_plotly(hist):
+    edges = hist["edges"]
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=hist["counts"], width=np.diff(edges),
+        marker_color="#6fa8dc", marker_line_color="white", marker_line_width=1,
+    ))
+    if hist["peak_age"] is not None:
+        fig.add_vline(x=hist["peak_age"], line_dash="dash", line_color="#e74c3c",
+                      annotation_text=f"峰值年龄: {hist['peak_age']}岁", annotation_font_color="#e74c3c")
+    fig.update_layout(title="用户年龄分布特征", xaxis_title="年龄", yaxis_title="用户数量", bargap=0)
+    return fig
+
+
+def cohort_plotly(labels, counts, mean, x_title, metric_title, title):
+    """
+    时间分群图：柱为各桶人数，折线为指标均值(右轴)；数据来自 utils.cohorts 的数组切片
+    """
+    fig = go.Figure(go.Bar(x=labels, y=counts, name="用户数量", marker_color="#6fa8dc"))
+    if mean is not None:
+        fig.add_trace(go.Scatter(x=labels, y=mean, name=f"平均{metric_title}", mode="lines+markers",
+                                 line={"color": "#e74c3c"}, yaxis="y2"))
+    fig.update_layout(title=title, xaxis={"title": x_title, "type": "category"}, yaxis_title="用户数量",
+                      yaxis2={"title": f"平均{metric_title}", "overlaying": "y", "side": "right"},
+                      legend={"orientation": "h", "y": 1.1})
+    return fig
+
+
+def cohort_level_plotly(table):
+    level_counts = table["level_counts"]
+    labels = [f"{age}年" for age in table["buckets"]]
+    fig = go.Figure([go.Bar(x=labels, y=level_counts[:, level], name=f"Lv{level}")
+                     for level in range(level_counts.shape[1])])
+    fig.update_layout(title="各账号年龄的等级构成", barmode="stack", yaxis_title="用户数量",
+                      xaxis={"title": "账号年龄", "type": "category"})
+    return fig
+
+
+def top_songs_plotly(top_songs):
+    fig = px.bar(x=top_songs.values, y=top_songs.index, orientation="h", text=top_songs.values,
+                 color=top_songs.values, color_continuous_scale="RdBu_r",
+                 labels={"x": "播放次数", "y": "歌曲名称"}, title="Top 20 热门歌曲")
+    fig.update_layout(yaxis={"categoryorder": "total ascending"}, coloraxis_showscale=False, height=600)
+    return fig
+
+
+def score_density_plotly(density):
+    fig = go.Figure(go.Scatter(x=density["x"], y=density["density"], mode="lines",
+                               fill="tozeroy", line={"color": "#FF7F0E", "width": 2}))
+    fig.add_vline(x=density["mean"], line_dash="dash", line_color="gray",
+                  annotation_text=f"均值: {density['mean']:.2f}")
+    fig.update_layout(title="用户评分分布曲线", xaxis_title="分数", yaxis_title="密度")
+    return fig
+
+
+def estimate_bar_plotly(est, x_label, y_label, title, horizontal=False):
+    """
+    近似模式：估计值柱状图，误差线为 95% 置信区间(est 来自 sample_store)
+    """
+    labels = [str(i) for i in est.index]
+    error = {"type": "data", "symmetric": False,
+             "array": est["high"] - est["estimate"], "arrayminus": est["estimate"] - est["low"]}
+    if horizontal:
+        bar = go.Bar(x=est["estimate"], y=labels, orientation="h", error_x=error, marker_color="#3d6fa8")
+        layout = {"yaxis": {"categoryorder": "total ascending", "title": x_label}, "xaxis_title": y_label,
+                  "height": 600}
+    else:
+        bar = go.Bar(x=labels, y=est["estimate"], error_y=error, marker_color="#3d6fa8")
+        layout = {"xaxis": {"type": "category", "title": x_label}, "yaxis_title": y_label}
+    fig = go.Figure(bar)
+    fig.update_layout(title=f"{title} (抽样估计, 95% 置信区间)", **layout)
+    return fig
+
+
+def estimate_bar_figure(est, x_label, y_label, title, horizontal=False):
+    labels = [str(i) for i in est.index]
+    error = [est["estimate"] - est["low"], est["high"] - est["estimate"]]
+    fig, ax = plt.subplots(figsize=(10, 6) if horizontal else None)
+    if horizontal:
+        ax.barh(labels[::-1], est["estimate"][::-1], xerr=[e[::-1] for e in error], color="#3d6fa8", capsize=3)
+        ax.set_xlabel(y_label, fontproperties=font_prop)
+        ax.set_ylabel(x_label, fontproperties=font_prop)
+        for label in ax.get_yticklabels():
+            label.set_fontproperties(font_prop)
+    else:
+        ax.bar(labels, est["estimate"], yerr=error, color="#3d6fa8", capsize=3)
+        ax.set_xlabel(x_label, fontproperties=font_prop)
+        ax.set_ylabel(y_label, fontproperties=font_prop)
+    ax.set_title(f"{title} (抽样估计, 95% 置信区间)", fontproperties=font_prop)
+    return fig
+
+
+def _log_axis(edges):
+    """
+    log(1+x) 坐标下的箱中心及以 1, 10, 100... 原始值标注的刻度
+    """
+    t = np.log1p(edges)
+    ticks = [0] + [10 ** p for p in range(int(np.log10(max(edges[-1], 1))) + 1)]
+    return (t[:-1] + t[1:]) / 2, {"tickvals": np.log1p(ticks), "ticktext": [f"{v:,}" for v in ticks]}
+
+
+def density_panel_plotly(grid):
+    counts = np.where(grid["counts"] > 0, grid["counts"], np.nan)
+    axes = {}
+    centers = {}
+    for axis, edges_key, log_key in (("x", "xedges", "x_log"), ("y", "yedges", "y_log")):
+        edges = grid[edges_key]
+        if grid[log_key]:
+            centers[axis], axes[f"{axis}axis"] = _log_axis(edges)
+        else:
+            centers[axis], axes[f"{axis}axis"] = (edges[:-1] + edges[1:]) / 2, {}
+        axes[f"{axis}axis"]["title"] = METRIC_LABELS.get(grid[axis], grid[axis])
+    fig = go.Figure(go.Heatmap(x=centers["x"], y=centers["y"], z=counts.T, colorscale="Viridis",
+                               colorbar={"title": "计数"}))
+    fig.update_layout(title=f"{axes['xaxis']['title']} vs {axes['yaxis']['title']} "
+                            f"(Pearson r={grid['corr']:.3f})", **axes)
+    return fig
+
+
+def correlation_heatmap_plotly(corr):
+    fig = px.imshow(corr, text_auto=".2f", color_continuous_scale="RdBu_r", zmin=-1, zmax=1,
+                    title="播放行为相关性热力图", aspect="auto")
+    fig.update_layout(height=600)
+    return fig
+
+
+# ==========================
+# 全部图表清单(离线导出使用)
+# key -> (所属页面, 标题, 构建函数)；构建函数无参数，内部走与页面相同的计算与缓存
+# ==========================
+def _cluster_default():
+    k = analytics.recommended_k()
+    labels, X_pca = analytics.cluster_users(k)
+    return cluster_figure(X_pca, labels, k)
+
+
+# 导出的分群图使用页面默认设置：指标为下拉框首项(等级)，全部时间范围
+COHORT_DEFAULT_METRIC = cohorts.COHORT_METRICS[0]
+
+
+def _cohort_default(kind):
+    table = cohorts.load_cohorts()[kind]
+    buckets, counts, mean = cohorts.cohort_slice(table, metric=COHORT_DEFAULT_METRIC)
+    metric_title = METRIC_LABELS.get(COHORT_DEFAULT_METRIC, COHORT_DEFAULT_METRIC)
+    if kind == "registration":
+        labels = [cohorts.month_label(m) for m in buckets]
+        return cohort_figure(labels, counts, mean, "注册月份", metric_title, "按注册月份的用户分群")
+    labels = [f"{age}年" for age in buckets]
+    return cohort_figure(labels, counts, mean, "账号年龄", metric_title, "按账号年龄的用户分群")
+
+
+CHARTS = {
+    "home_cluster": ("主页", "用户聚类分布", _cluster_default),
+    "home_k_selection": ("主页", "K 值选择诊断", lambda: k_selection_figure(
+                             analytics.k_selection(*analytics.K_RANGE, analytics.SILHOUETTE_SAMPLE))),
+    "profile_level": ("用户画像", "用户等级分布",
+                      lambda: level_distribution_figure(analytics.level_counts())),
+    "profile_gender": ("用户画像", "用户性别比例",
+                       lambda: gender_pie_figure(analytics.gender_counts())),
+    "profile_province": ("用户画像", "用户地区分布",
+                         lambda: province_bar_figure(analytics.province_counts())),
+    "profile_age": ("用户画像", "用户年龄分布",
+                    lambda: age_histogram_figure(analytics.valid_ages())),
+    "profile_cohort_registration": ("用户画像", "按注册月份的用户分群",
+                                    lambda: _cohort_default("registration")),
+    "profile_cohort_account_age": ("用户画像", "按账号年龄的用户分群",
+                                   lambda: _cohort_default("account_age")),
+    "profile_cohort_level": ("用户画像", "各账号年龄的等级构成",
+                             lambda: cohort_level_figure(cohorts.load_cohorts()["account_age"])),
+    "social_regression": ("社交互动", "线性回归 - 预测粉丝数",
+                          lambda: regression_figure(analytics.fans_regression())),
+    "social_parallel": ("社交互动", "平行分类图",
+                        lambda: parallel_categories_figure(
+                            analytics.parallel_categories_frame(analytics.load_social_frame()))),
+    "playlist_level_fit": ("歌单偏好", "用户等级与歌单数量关系",
+                           lambda: level_playlist_figure(analytics.level_playlist_fit())),
+    "playlist_province": ("歌单偏好", "各省份人均歌单数量 Top10",
+                          lambda: province_treemap_figure(analytics.province_playlist_top10())),
+    "playlist_hexbin": ("歌单偏好", "总歌单数与粉丝数量的关系",
+                        lambda: density_panel_figure(binning.density_grid("total_playlists", "fans_count"))),
+    "behaviour_top_songs": ("播放行为", "最受欢迎的歌曲 Top 20",
+                            lambda: top_songs_figure(analytics.top_songs(20))),
+    "behaviour_score": ("播放行为", "用户评分分布",
+                        lambda: score_kde_figure(analytics.score_density())),
+    "behaviour_wordcloud": ("播放行为", "用户喜欢的歌手词云图",
+                            lambda: wordcloud_figure(analytics.song_frequencies())),
+    "behaviour_corr": ("播放行为", "播放行为相关性热力图",
+                       lambda: correlation_heatmap_figure(analytics.behaviour_corr())),
+}
@@ -0,0 +1,98 @@
+# utils/cohorts.py
+# 按时间桶预聚合的用户分群表：注册月份、账号年龄各一张稠密数组表(账号年龄另有 年龄×等级 人数矩阵)，
+# 每个桶存人数与各指标之和，图表按区间切片后求均值即可，不再逐行处理时间戳
+from datetime import date
+
+import numpy as np
+
+from utils.data_loader import USE_SNAPSHOT, add_time_buckets, load_table
+from utils.disk_cache import disk_cached
+from utils.user_features import DATA_FILES as FEATURE_FILES, FEATURE_COLUMNS, load_user_features
+
+# 各表中累加的指标(人数单独统计)
+COHORT_METRICS = FEATURE_COLUMNS
+MAX_LEVEL = 10
+
+
+def month_label(month):
+    """
+    自 1970-01 起的月数 -> "YYYY-MM"
+    """
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+def current_month():
+    today = date.today()
+    return (today.year - 1970) * 12 + today.month - 1
+
+
+def _bucket_table(buckets, values, lo, hi):
+    """
+    buckets 为整数桶编号(无效为 -1)，返回 [lo, hi] 上的稠密表 {"buckets", "counts", "sums": {指标: 数组}}
+    """
+    valid = (buckets >= lo) & (buckets <= hi)
+    index = buckets[valid] - lo
+    size = hi - lo + 1
+    return {
+        "buckets": np.arange(lo, hi + 1),
+        "counts": np.bincount(index, minlength=size),
+        "sums": {m: np.bincount(index, weights=v[valid], minlength=size) for m, v in values.items()},
+    }
+
+
+@disk_cached(scope="analytics", sources=FEATURE_FILES, version=3)
+def cohort_tables(ref_month):
+    """
+    两张时间分群表(ref_month 为计算账号年龄的参考月份，由 load_cohorts 传入当前月份)：
+    - registration: 按注册月份
+    - account_age: 按账号年龄(整年)，另含 level_counts[年龄, 等级] 二维计数(各账号年龄的等级构成)
+    """
+    if USE_SNAPSHOT:
+        # 快照入库时已换算好时间桶，只读取整数列
+        users = load_table("basic_info", columns=["user_id", "create_month"])
+    else:
+        users = add_time_buckets(load_table("basic_info", columns=["user_id", "createTime", "birthday"]).copy())
+
+    features = load_user_features().set_index("user_id")
+    aligned = features.reindex(users["user_id"])
+    values = {m: aligned[m].fillna(0).to_numpy(dtype=np.float64) for m in COHORT_METRICS}
+
+    create_month = users["create_month"].to_numpy()
+    registered = create_month[create_month >= 0]
+    tables = {}
+    if len(registered):
+        tables["registration"] = _bucket_table(create_month, values, int(registered.min()), int(registered.max()))
+    else:
+        tables["registration"] = _bucket_table(create_month, values, 0, -1)
+
+    age = np.where(create_month >= 0, (ref_month - create_month) // 12, -1)
+    max_age = int(age.max()) if len(age) and age.max() >= 0 else -1
+    account_age = _bucket_table(age, values, 0, max_age)
+    level = np.clip(aligned["level"].fillna(0).to_numpy(dtype=np.int64), 0, MAX_LEVEL)
+    ok = age >= 0
+    account_age["level_counts"] = np.bincount(age[ok] * (MAX_LEVEL + 1) + level[ok],
+                                              minlength=(max_age + 1) * (MAX_LEVEL + 1)
+                                              ).reshape(max_age + 1, MAX_LEVEL + 1)
+    tables["account_age"] = account_age
+
+    tables["ref_month"] = ref_month
+    return tables
+
+
+def load_cohorts():
+    return cohort_tables(current_month())
+
+
+def cohort_slice(table, lo=None, hi=None, metric=None):
+    """
+    按桶区间 [lo, hi] 切片，返回 (buckets, 人数, 指标均值或 None)；只做数组切片与一次除法
+    """
+    buckets = table["buckets"]
+    start = 0 if lo is None else int(np.searchsorted(buckets, lo))
+    stop = len(buckets) if hi is None else int(np.searchsorted(buckets, hi, side="right"))
+    counts = table["counts"][start:stop]
+    if metric is None:
+        return buckets[start:stop], counts, None
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = table["sums"][metric][start:stop] / counts
+    return buckets[start:stop], counts, np.where(counts > 0, mean, np.nan)
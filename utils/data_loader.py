@@ -1,5 +1,186 @@
 # utils/data_loader.py
+import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+from utils import snapshot
+from utils.disk_cache import notify_access
+
+DATA_DIR = os.environ.get("NETEASE_DATA_DIR", "E:/Netease_analysis/data")
+# 设为 0 时不使用共享快照，直接按需读取 CSV(本地调试用)
+USE_SNAPSHOT = os.environ.get("NETEASE_USE_SNAPSHOT", "1") != "0"
+# 直接读 CSV 并带过滤条件时的分块行数
+CSV_CHUNK_SIZE = 200_000
+
+# 分析用数据表 -> CSV 文件
+TABLE_FILES = {
+    "basic_info": "basic_info.csv",
+    "listening_records": "listening_records.csv",
+    "playlist_info": "playlist_info.csv",
+    "social_info": "social_info.csv",
+}
+
+# 本进程内已转换的 DataFrame：{(name, columns, filters): (pa.Table, DataFrame)}，快照版本变化时重建
+_frames = {}
+
+
+def table_path(name):
+    return os.path.join(DATA_DIR, TABLE_FILES[name])
+
+
+def intern_song_names(df):
+    """
+    入库时把 song_name 驻留为整数编号：
+    歌名按字典序编号(song_id)，播放记录中只存 int32 编号 + 一份共享的歌名字典，
+    转成 DataFrame 后是 Categorical，value_counts 等直接在整数编码上进行
+    """
+    codes, names = pd.factorize(df["song_name"], sort=True)
+    table = pa.Table.from_pandas(df.drop(columns=["song_name"]), preserve_index=False)
+    indices = pa.array(codes.astype(np.int32), mask=codes < 0)
+    song_col = pa.DictionaryArray.from_arrays(indices, pa.array(names.astype(str).tolist(), type=pa.string()))
+    position = list(df.columns).index("song_name")
+    return table.add_column(position, "song_name", song_col)
+
+
+# 生日字段中表示"未填写"的取值：1900-01-01(北京时间)占位及 -1
+BIRTHDAY_PLACEHOLDERS = [-2209017600000, -1]
+# 入库时由时间戳换算出的整数时间桶，无效值为 -1
+TIME_BUCKET_COLUMNS = ["create_month", "birth_year"]
+
+
+def add_time_buckets(df):
+    """
+    入库时把毫秒时间戳一次性换算为整数时间桶，之后的分析只做整数运算：
+    - create_month: 注册月份，自 1970-01 起的月数
+    - birth_year: 出生年份(占位值/缺失为 -1)
+    """
+    created = pd.to_datetime(pd.to_numeric(df["createTime"], errors="coerce"), unit="ms", errors="coerce")
+    df["create_month"] = ((created.dt.year - 1970) * 12 + created.dt.month - 1).fillna(-1).astype(np.int32)
+
+    birth_ms = pd.to_numeric(df["birthday"], errors="coerce")
+    birth = pd.to_datetime(birth_ms.where(~birth_ms.isin(BIRTHDAY_PLACEHOLDERS)), unit="ms", errors="coerce")
+    df["birth_year"] = birth.dt.year.fillna(-1).astype(np.int16)
+    return df
+
+
+def build_basic_info(df):
+    return pa.Table.from_pandas(add_time_buckets(df), preserve_index=False)
+
+
+def build_user_sample(df):
+    # 延迟导入：sample_store 依赖本模块
+    from utils.sample_store import reservoir_sample
+
+    chunks = (df.iloc[start:start + CSV_CHUNK_SIZE] for start in range(0, len(df), CSV_CHUNK_SIZE))
+    return pa.Table.from_pandas(reservoir_sample(chunks), preserve_index=False)
+
+
+# 各表发布快照时的转换函数
+TABLE_BUILDERS = {
+    "basic_info": build_basic_info,
+    "listening_records": intern_song_names,
+}
+# 各表入库时一并生成的附属快照：{表: {后缀: 转换函数}}
+TABLE_SIDECARS = {
+    # 近似模式的分层用户抽样，随基础信息入库一起做蓄水池抽样
+    "basic_info": {"sample": build_user_sample},
+}
+
+
+def publish_table(name):
+    """
+    确保 name 当前版本的快照(及附属快照)已发布，返回主快照路径
+    """
+    return snapshot.publish(name, table_path(name), build=TABLE_BUILDERS.get(name),
+                            sidecars=TABLE_SIDECARS.get(name))
+
+
+def attach_table(name):
+    """
+    返回 name 对应的共享快照(pa.Table)
+    """
+    return snapshot.attach(name, table_path(name), build=TABLE_BUILDERS.get(name),
+                           sidecars=TABLE_SIDECARS.get(name))
+
+
+def load_sidecar(name, suffix):
+    """
+    读取 name 当前版本的附属快照，返回 DataFrame
+    """
+    path = snapshot.sidecar_path(publish_table(name), suffix)
+    return snapshot.to_pandas(snapshot.read_table(path))
+
+
+def load_table(name, columns=None, filters=None):
+    """
+    从共享快照加载数据表：
+    首个进程把 CSV 解析后发布为 Arrow 文件(/dev/shm)，其余进程只读映射同一份数据
+    - columns: 只读取这些列，例如 ["user_id", "level"]
+    - filters: [(列名, 操作, 值), ...]，例如 [("level", ">=", 8)]，多个条件为"与"
+    返回的 DataFrame 在本进程内共享，调用方需要修改时请先 copy()
+    """
+    columns = list(columns) if columns else None
+    filters = [tuple(f) for f in filters] if filters else None
+    if not USE_SNAPSHOT:
+        df = read_csv_projected(table_path(name), columns, filters)
+        notify_access("frames", name, df)
+        return df
+
+    table = attach_table(name)
+    key = (name, tuple(columns or ()), repr(filters))
+    cached = _frames.get(key)
+    if cached is None or cached[0] is not table:
+        # 快照版本变化时丢弃该表的全部旧转换结果(含不会再被请求的键)，旧文件的映射随之释放
+        for old_key in [k for k, v in _frames.items() if k[0] == name and v[0] is not table]:
+            del _frames[old_key]
+        cached = (table, snapshot.to_pandas(snapshot.scan(table, columns, filters)))
+        _frames[key] = cached
+    notify_access("frames", name, cached[1])
+    return cached[1]
+
+
+def read_csv_projected(path, columns=None, filters=None):
+    """
+    直接读 CSV 时的下推：列用 usecols 裁剪，过滤条件按块应用，避免整表常驻内存
+    """
+    filter_cols = [col for col, _, _ in filters or []]
+    usecols = None
+    if columns:
+        usecols = list(columns) + [c for c in filter_cols if c not in columns]
+    if not filters:
+        return pd.read_csv(path, usecols=usecols)
+
+    parts = []
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=CSV_CHUNK_SIZE):
+        parts.append(chunk[_filter_mask(chunk, filters)])
+    df = pd.concat(parts, ignore_index=True)
+    return df[columns] if columns else df
+
+
+def _filter_mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        s = df[col]
+        if op == "==":
+            cond = s == value
+        elif op == "!=":
+            cond = s != value
+        elif op == ">":
+            cond = s > value
+        elif op == ">=":
+            cond = s >= value
+        elif op == "<":
+            cond = s < value
+        elif op == "<=":
+            cond = s <= value
+        elif op == "in":
+            cond = s.isin(list(value))
+        else:
+            raise ValueError(f"不支持的过滤操作: {op}")
+        mask &= cond
+    return mask
+
 
 def load_basic_info(path):
     df = pd.read_csv(path)
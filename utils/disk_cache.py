@@ -0,0 +1,319 @@
+# utils/disk_cache.py
+import os
+import json
+import pickle
+import hashlib
+import shutil
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+from utils.single_flight import SingleFlight
+
+# 缓存根目录，可通过环境变量覆盖
+CACHE_DIR = os.environ.get("NETEASE_CACHE_DIR", "E:/Netease_analysis/cache")
+# 磁盘缓存总容量上限(字节)，超出后按最近最少使用(LRU)淘汰
+MAX_CACHE_BYTES = int(os.environ.get("NETEASE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# 进程内热点条目数，避免每次 rerun 都从磁盘反序列化
+MEMORY_ENTRIES = 32
+# 缓存条目格式版本，键的构成或序列化方式变化时递增，旧条目自动失效
+CACHE_FORMAT_VERSION = 2
+
+
+def file_fingerprint(path, with_hash=False):
+    """
+    返回源文件指纹 (绝对路径, 大小, 修改时间ns, 可选sha1)
+    文件不存在时大小与修改时间均为 -1，仍可参与缓存键计算
+    """
+    abs_path = os.path.abspath(path)
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return (abs_path, -1, -1, None)
+
+    digest = None
+    if with_hash:
+        h = hashlib.sha1()
+        with open(abs_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+    return (abs_path, st.st_size, st.st_mtime_ns, digest)
+
+
+# 源文件内容摘要记录 {绝对路径: [大小, 修改时间ns, sha1]}，多进程共享，避免每次启动都重新读全量文件
+DIGEST_PATH = os.path.join(CACHE_DIR, "source_digests.json")
+_digests = None
+_digest_lock = threading.Lock()
+
+
+def _load_digests():
+    try:
+        with open(DIGEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_digests(digests):
+    try:
+        os.makedirs(os.path.dirname(DIGEST_PATH), exist_ok=True)
+        tmp_path = f"{DIGEST_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(digests, f, ensure_ascii=False)
+        os.replace(tmp_path, DIGEST_PATH)
+    except OSError:
+        pass  # 只是少了记录，下次重新计算
+
+
+def source_digest(path):
+    """
+    源文件内容的 sha1，文件不存在时返回 None
+    大小与修改时间未变时直接复用记录；变化时重新读文件计算，因此只 touch 而内容不变的文件摘要不变
+    磁盘缓存、共享快照与依赖图(utils/artifact_graph.py)都以它作为源文件版本
+    """
+    global _digests
+    abs_path, size, mtime_ns, _ = file_fingerprint(path)
+    if size < 0:
+        return None
+    stat_key = [size, mtime_ns]
+
+    with _digest_lock:
+        if _digests is None:
+            _digests = _load_digests()
+        cached = _digests.get(abs_path)
+        if cached is None or cached[:2] != stat_key:
+            # 可能其它进程已经算过，先重新读一次记录
+            _digests.update(_load_digests())
+            cached = _digests.get(abs_path)
+        if cached is not None and cached[:2] == stat_key:
+            return cached[2]
+
+    def compute():
+        digest = file_fingerprint(abs_path, with_hash=True)[3]
+        with _digest_lock:
+            _digests[abs_path] = stat_key + [digest]
+            _save_digests(_digests)
+        return digest
+
+    # 大文件的摘要可能要读几秒，并发请求同一文件时只读一次
+    return _flights.do(("digest", abs_path, size, mtime_ns), compute)
+
+
+def _hash(obj):
+    return hashlib.sha1(repr(obj).encode("utf-8")).hexdigest()[:20]
+
+
+class DiskCache:
+    """
+    持久化磁盘缓存：
+    - 每个条目一个 pickle 文件，存放在 <root>/<scope>/ 下，文件名为 <基础键>-<指纹键>.pkl
+    - 同一基础键(函数+参数)写入新版本时，旧版本立即删除
+    - 总容量超过 max_bytes 时按文件修改时间(访问时会刷新)淘汰最旧条目
+    - invalidate_scope 只删除对应作用域，例如写 users.csv 不会影响分析数据
+    多进程共享同一目录是安全的：写入先落临时文件再 os.replace
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _scope_dir(self, scope):
+        return os.path.join(self.root, scope)
+
+    def _entry_path(self, scope, base_key, version_key):
+        return os.path.join(self._scope_dir(scope), f"{base_key}-{version_key}.pkl")
+
+    def get(self, scope, base_key, version_key):
+        """
+        命中返回 (True, value)，未命中返回 (False, None)
+        """
+        mem_key = (scope, base_key, version_key)
+        with self._lock:
+            if mem_key in self._memory:
+                self._memory.move_to_end(mem_key)
+                return True, self._memory[mem_key]
+
+        path = self._entry_path(scope, base_key, version_key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path, None)  # 刷新 LRU 时间
+        except FileNotFoundError:
+            return False, None
+        except Exception:
+            # 截断的文件，或由旧版本 pandas / sklearn / 旧类定义写出而无法还原的条目：视为未命中并删除
+            self._remove_file(path)
+            return False, None
+
+        self._remember(mem_key, value)
+        return True, value
+
+    def set(self, scope, base_key, version_key, value):
+        scope_dir = self._scope_dir(scope)
+        os.makedirs(scope_dir, exist_ok=True)
+        path = self._entry_path(scope, base_key, version_key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            # 磁盘不可写时只保留内存缓存，不影响页面渲染
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self._remember((scope, base_key, version_key), value)
+            return
+
+        # 删除同一基础键的旧版本(源文件已变化)
+        for name in os.listdir(scope_dir):
+            if name.startswith(f"{base_key}-") and name.endswith(".pkl") \
+                    and name != os.path.basename(path):
+                self._remove_file(os.path.join(scope_dir, name))
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == scope and k[1] == base_key]:
+                del self._memory[key]
+
+        self._remember((scope, base_key, version_key), value)
+        self.evict()
+
+    def invalidate_scope(self, scope):
+        """
+        清空某一作用域下的全部条目
+        """
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == scope]:
+                del self._memory[key]
+        shutil.rmtree(self._scope_dir(scope), ignore_errors=True)
+
+    def evict(self):
+        """
+        总容量超过上限时，按最近访问时间从旧到新删除条目
+        """
+        entries = []
+        total = 0
+        if not os.path.isdir(self.root):
+            return
+        for scope in os.listdir(self.root):
+            scope_dir = self._scope_dir(scope)
+            if not os.path.isdir(scope_dir):
+                continue
+            for name in os.listdir(scope_dir):
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(scope_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+
+    def _remember(self, mem_key, value):
+        with self._lock:
+            self._memory[mem_key] = value
+            self._memory.move_to_end(mem_key)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_default_cache = DiskCache()
+# 同一缓存条目并发未命中时只计算一次
+_flights = SingleFlight()
+
+# 访问回调(kind, name, value)，供会话内存统计等使用
+_access_hooks = []
+
+
+def add_access_hook(hook):
+    if hook not in _access_hooks:
+        _access_hooks.append(hook)
+
+
+def notify_access(kind, name, value):
+    for hook in _access_hooks:
+        hook(kind, name, value)
+
+
+def get_cache():
+    return _default_cache
+
+
+def invalidate_scope(scope):
+    _default_cache.invalidate_scope(scope)
+
+
+def disk_cached(scope, sources, name=None, version=1):
+    """
+    装饰器：把函数结果按 (函数, 参数, 源文件内容摘要) 持久化到磁盘
+    - scope: 作用域名称，如 "analytics" / "users"
+    - sources: 源文件路径列表，或接收同样参数并返回路径列表的函数
+    - name: 缓存名称；页面模块都以 page_module 名称动态加载，需显式命名避免冲突
+    - version: 函数代码版本，返回值的内容或结构变化时递增，旧条目随之失效
+    参数按函数签名绑定并补齐默认值后参与缓存键：f(3) 与 f(n_clusters=3) 是同一条目，
+    默认值(如由环境变量决定的扫描范围)变化时也不会误用旧结果
+    同一条目的并发未命中由 SingleFlight 合并为一次计算，异常传给所有等待者且不写入缓存
+    wrapper.cache_version(*args, **kwargs) 返回当前数据对应的缓存版本，依赖图用它判断节点是否过期
+    """
+    def decorator(func):
+        func_id = name or f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        def _bind(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return bound
+
+        def _paths(bound):
+            return sources(*bound.args, **bound.kwargs) if callable(sources) else sources
+
+        def _version(bound):
+            return _hash((CACHE_FORMAT_VERSION, version, [source_digest(p) for p in _paths(bound)]))
+
+        def cache_version(*args, **kwargs):
+            return _version(_bind(args, kwargs))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = _bind(args, kwargs)
+            base_key = _hash((func_id, list(bound.arguments.items()), list(_paths(bound))))
+            version_key = _version(bound)
+
+            hit, value = _default_cache.get(scope, base_key, version_key)
+            if not hit:
+                def compute():
+                    # 可能刚有另一次计算完成并写入，先再查一次
+                    hit, value = _default_cache.get(scope, base_key, version_key)
+                    if not hit:
+                        value = func(*bound.args, **bound.kwargs)
+                        _default_cache.set(scope, base_key, version_key, value)
+                    return value
+
+                value = _flights.do((scope, base_key, version_key), compute)
+            notify_access("cache", func_id, value)
+            return value
+
+        wrapper.scope = scope
+        wrapper.cache_version = cache_version
+        return wrapper
+
+    return decorator
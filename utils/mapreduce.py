@@ -0,0 +1,254 @@
+# utils/mapreduce.py
+# 播放记录按用户区间分区，聚合在进程池上以 map / reduce 方式并行执行
+# 分区直接切片按 user_id 排序的索引文件(utils/user_index.py)，不再另写一份分区副本
+import os
+import multiprocessing
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils import snapshot, user_index
+from utils.data_loader import load_table
+
+# 分区数，建议不少于 CPU 核数
+NUM_PARTITIONS = int(os.environ.get("NETEASE_PARTITIONS", 32))
+# 进程池大小，默认使用全部核
+MAX_WORKERS = int(os.environ.get("NETEASE_MAPREDUCE_WORKERS", os.cpu_count() or 1))
+# 行数低于该值时直接在当前进程中顺序执行，省去进程池开销
+PARALLEL_MIN_ROWS = 1_000_000
+
+# 子进程中已映射的索引文件：{路径: pa.Table}
+_opened = {}
+
+
+def partitions():
+    """
+    返回 (排序索引文件路径, [(起始行, 结束行), ...])
+    按行数均分为 NUM_PARTITIONS 段，分段点对齐到用户边界，同一用户的记录只落在一个分区
+    """
+    path = user_index.index_path()
+    offsets = user_index.offsets_of(path)
+    rows = int(offsets[-1])
+    targets = np.linspace(0, rows, NUM_PARTITIONS + 1)
+    bounds = np.unique(np.asarray(offsets)[np.searchsorted(offsets, targets)])
+    return path, [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _slice(path, start, stop):
+    table = _opened.get(path)
+    if table is None:
+        _opened.clear()
+        table = snapshot.read_table(path)
+        _opened[path] = table
+    return table.slice(start, stop - start)
+
+
+# ==========================
+# 聚合定义：map 在单个分区上计算部分结果，reduce 合并部分结果
+# ==========================
+class ScoreMoments(NamedTuple):
+    count: int
+    mean: float
+    m2: float
+    minimum: float
+    maximum: float
+
+    def merge(self, other):
+        # Chan 等人的并行合并公式，避免 Σx² 直接相减的数值误差
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        return ScoreMoments(
+            n,
+            self.mean + delta * other.count / n,
+            self.m2 + other.m2 + delta * delta * self.count * other.count / n,
+            min(self.minimum, other.minimum),
+            max(self.maximum, other.maximum),
+        )
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return float("nan")
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+
+class SongTotals(NamedTuple):
+    records: np.ndarray
+    total_plays: np.ndarray
+    score_sum: np.ndarray
+    score_cnt: np.ndarray
+    listeners: np.ndarray
+
+    def merge(self, other):
+        return SongTotals(*(a + b for a, b in zip(self, other)))
+
+
+class CorrSums(NamedTuple):
+    """
+    成对完整观测(两列均非空)上的计数与和，合并后即可得到与 DataFrame.corr() 相同的相关系数矩阵
+    n[i, j] 为行数，sx[i, j] 为这些行上第 i 列之和，sxx 为平方和，sxy[i, j] 为 Σ x_i·x_j
+    """
+    n: np.ndarray
+    sx: np.ndarray
+    sxx: np.ndarray
+    sxy: np.ndarray
+
+    def merge(self, other):
+        return CorrSums(*(a + b for a, b in zip(self, other)))
+
+    def corr(self):
+        n, sx, sxx, sxy = self
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sx.T
+            var = (n * sxx - sx ** 2) * (n * sxx.T - sx.T ** 2)
+            return np.where(var > 0, cov / np.sqrt(var), np.nan)
+
+
+def map_user_plays(table):
+    """
+    分区内每个用户的播放次数之和；分区按用户划分，各分区结果互不重叠
+    """
+    df = pd.DataFrame({"user_id": table["user_id"].to_numpy(),
+                       "playCount": table["playCount"].to_numpy(zero_copy_only=False)})
+    return df.groupby("user_id", as_index=False)["playCount"].sum()
+
+
+def reduce_user_plays(partials):
+    partials = [p for p in partials if p is not None]
+    if not partials:
+        return pd.DataFrame({"user_id": [], "total_plays": []})
+    return pd.concat(partials, ignore_index=True).rename(columns={"playCount": "total_plays"})
+
+
+def _scores(table):
+    score = table["score"].to_numpy(zero_copy_only=False).astype(np.float64)
+    return score[~np.isnan(score)]
+
+
+def map_score_moments(table):
+    return moments_of(_scores(table))
+
+
+def moments_of(score):
+    """
+    评分数组(已去除空值)的 ScoreMoments；空数组返回 None
+    """
+    if len(score) == 0:
+        return None
+    mean = float(score.mean())
+    return ScoreMoments(len(score), mean, float(((score - mean) ** 2).sum()),
+                        float(score.min()), float(score.max()))
+
+
+def map_score_histogram(table, lo, hi, points):
+    """
+    固定区间 [lo, hi] 上的评分分箱计数，各分区结果直接相加
+    """
+    counts, _ = np.histogram(_scores(table), bins=points, range=(lo, hi))
+    return counts
+
+
+def map_song_totals(table):
+    """
+    分区内按歌曲编号(song_id)累计；所有分区共享同一份歌名字典，数组长度一致
+    同一用户只出现在一个分区，分区内去重的 (歌曲, 用户) 对在全局也不重复
+    """
+    column = table["song_name"]
+    n = len(column.chunk(0).dictionary)
+    codes = np.concatenate([c.indices.fill_null(-1).to_numpy(zero_copy_only=False) for c in column.chunks])
+    return song_totals_of(codes, table["playCount"].to_numpy(zero_copy_only=False),
+                          table["score"].to_numpy(zero_copy_only=False), table["user_id"].to_numpy(), n)
+
+
+def song_totals_of(codes, plays, score, user, n):
+    """
+    按歌曲编号 codes(缺失为 -1)累计 SongTotals，数组长度为歌曲数 n
+    """
+    valid = codes >= 0
+    song = codes[valid]
+    plays = np.nan_to_num(np.asarray(plays, dtype=np.float64)[valid])
+    score = np.asarray(score, dtype=np.float64)[valid]
+    user = np.asarray(user)[valid]
+    has_score = ~np.isnan(score)
+    pairs = pd.DataFrame({"song": song, "user": user}).drop_duplicates()
+
+    return SongTotals(
+        np.bincount(song, minlength=n).astype(np.float64),
+        np.bincount(song, weights=plays, minlength=n),
+        np.bincount(song[has_score], weights=score[has_score], minlength=n),
+        np.bincount(song[has_score], minlength=n).astype(np.float64),
+        np.bincount(pairs["song"].to_numpy(), minlength=n).astype(np.float64),
+    )
+
+
+def map_corr_sums(table, columns, user_tables):
+    """
+    分区内的播放记录逐条关联用户级的表(user_tables: {表名: 列})后，累计 columns 两两之间的和
+    分区覆盖连续的 user_id 区间，用户表只取该区间内的行参与合并
+    """
+    df = pd.DataFrame({c: table[c].to_numpy(zero_copy_only=False) for c in ["user_id", "playCount", "score"]})
+    lo, hi = df["user_id"].min(), df["user_id"].max()
+    for name, cols in user_tables.items():
+        right = load_table(name, columns=cols)
+        right = right[(right["user_id"] >= lo) & (right["user_id"] <= hi)]
+        df = pd.merge(df, right, on="user_id", how="left")
+
+    X = df[columns].to_numpy(dtype=np.float64)
+    valid = (~np.isnan(X)).astype(np.float64)
+    X = np.nan_to_num(X)
+    return CorrSums(valid.T @ valid, X.T @ valid, (X * X).T @ valid, X.T @ X)
+
+
+def _reduce_merge(partials):
+    partials = [p for p in partials if p is not None]
+    if not partials:
+        return None
+    result = partials[0]
+    for part in partials[1:]:
+        result = result.merge(part)
+    return result
+
+
+def _reduce_sum(partials):
+    partials = [p for p in partials if p is not None]
+    return sum(partials[1:], partials[0]) if partials else None
+
+
+AGGREGATIONS = {
+    "user_plays": (map_user_plays, reduce_user_plays),
+    "score_moments": (map_score_moments, _reduce_merge),
+    "score_histogram": (map_score_histogram, _reduce_sum),
+    "song_totals": (map_song_totals, _reduce_merge),
+    "corr_sums": (map_corr_sums, _reduce_merge),
+}
+
+
+def _run_map(name, path, start, stop, params):
+    # 空分区不参与 reduce
+    if stop <= start:
+        return None
+    map_fn, _ = AGGREGATIONS[name]
+    return map_fn(_slice(path, start, stop), **params)
+
+
+def run(name, workers=None, **params):
+    """
+    在全部分区上执行聚合 name(params 传给 map 函数)，返回 reduce 后的结果；没有任何记录时各聚合返回空结果或 None
+    数据量较大时每个分区一个 map 任务提交到进程池，各进程只读映射同一份排序索引文件并切片
+    进程池使用 spawn 启动：Streamlit 服务端与预热线程都是多线程进程，fork 可能复制到被其它线程持有的锁
+    """
+    _, reduce_fn = AGGREGATIONS[name]
+    path, ranges = partitions()
+    rows = ranges[-1][1] if ranges else 0
+    workers = workers or MAX_WORKERS
+
+    if rows < PARALLEL_MIN_ROWS or workers <= 1:
+        partials = [_run_map(name, path, start, stop, params) for start, stop in ranges]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as pool:
+            futures = [pool.submit(_run_map, name, path, start, stop, params) for start, stop in ranges]
+            partials = [f.result() for f in futures]
+    return reduce_fn(partials)
@@ -0,0 +1,165 @@
+# utils/pagination.py
+import math
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+from utils import snapshot
+from utils.data_loader import USE_SNAPSHOT, attach_table, load_table
+
+# 每个进程缓存的排序下标个数(每份为 int64 × 行数)
+SORT_CACHE_ENTRIES = 8
+# 每个进程缓存的 DataFrame 转换结果个数(各页面各一份)
+FRAME_CACHE_ENTRIES = 6
+FILTER_OPS = ["==", "!=", ">", ">=", "<", "<="]
+
+_sort_cache = OrderedDict()
+_filter_cache = OrderedDict()
+_frame_tables = OrderedDict()
+
+
+def _source_table(source):
+    """
+    source 为数据表名称时返回共享快照(不使用快照时读取 CSV 后按 DataFrame 处理)；
+    为 DataFrame 时转换一次并按对象缓存(LRU)，不同页面的会话各自使用不同的 DataFrame，互不挤占
+    """
+    if isinstance(source, str):
+        if USE_SNAPSHOT:
+            return attach_table(source)
+        source = load_table(source)
+    key = id(source)
+    cached = _frame_tables.get(key)
+    if cached is not None and cached[0] is source:
+        _frame_tables.move_to_end(key)
+        return cached[1]
+    cached = (source, pa.Table.from_pandas(source, preserve_index=False))
+    _frame_tables[key] = cached
+    _frame_tables.move_to_end(key)
+    while len(_frame_tables) > FRAME_CACHE_ENTRIES:
+        _frame_tables.popitem(last=False)
+    return cached[1]
+
+
+def _sort_key(column):
+    """
+    排序用的列：字典编码列(如驻留后的 song_name)不能直接 sort_indices；
+    字典已按字典序排列时直接按整数编号排序，否则先解码为原始值
+    """
+    if not pa.types.is_dictionary(column.type):
+        return column
+    if column.num_chunks == 0:
+        return column.cast(column.type.value_type)
+    dictionary = column.chunk(0).dictionary
+    if len(dictionary) < 2 or pc.all(pc.less(dictionary[:-1], dictionary[1:])).as_py():
+        # Arrow 文件(或单个 DataFrame 转换结果)的各批共享同一字典，编号顺序即字典序
+        return pa.chunked_array([chunk.indices for chunk in column.chunks])
+    return pa.chunked_array([chunk.dictionary_decode() for chunk in column.chunks])
+
+
+def _sort_indices(table, sort_by, ascending):
+    key = (id(table), sort_by, ascending)
+    cached = _sort_cache.get(key)
+    if cached is not None and cached[0] is table:
+        _sort_cache.move_to_end(key)
+        return cached[1]
+    order = "ascending" if ascending else "descending"
+    keys = pa.table({sort_by: _sort_key(table[sort_by])})
+    indices = pc.sort_indices(keys, sort_keys=[(sort_by, order)])
+    _sort_cache[key] = (table, indices)
+    while len(_sort_cache) > SORT_CACHE_ENTRIES:
+        _sort_cache.popitem(last=False)
+    return indices
+
+
+def _filtered_table(table, filters):
+    """
+    过滤结果按 (表, 条件) 缓存，翻页时不重复过滤，排序下标缓存也能命中
+    """
+    key = (id(table), repr(filters))
+    cached = _filter_cache.get(key)
+    if cached is not None and cached[0] is table:
+        _filter_cache.move_to_end(key)
+        return cached[1]
+    result = snapshot.scan(table, filters=filters)
+    _filter_cache[key] = (table, result)
+    while len(_filter_cache) > SORT_CACHE_ENTRIES:
+        _filter_cache.popitem(last=False)
+    return result
+
+
+def fetch_page(source, page=1, page_size=100, sort_by=None, ascending=True, filters=None, columns=None):
+    """
+    只取第 page 页(从 1 开始)的数据，返回 (DataFrame, 总行数)
+    - 无排序时直接对映射表做零拷贝切片，第 1 页与第 100 万页代价相同
+    - 过滤条件走快照的批级跳过(min/max)后再精确过滤
+    - 过滤结果与排序下标按条件缓存，翻页只做一次切片 / take
+    """
+    table = _source_table(source)
+    filters = [tuple(f) for f in filters or []]
+    if filters:
+        table = _filtered_table(table, filters)
+
+    total = table.num_rows
+    offset = max(page - 1, 0) * page_size
+    if sort_by:
+        indices = _sort_indices(table, sort_by, ascending)
+        part = table.take(indices.slice(offset, page_size))
+    else:
+        part = table.slice(offset, page_size)
+
+    if columns:
+        part = part.select(columns)
+    return snapshot.to_pandas(part), total
+
+
+def _parse_value(table, column, text):
+    field_type = table.schema.field(column).type
+    if pa.types.is_integer(field_type):
+        return int(text)
+    if pa.types.is_floating(field_type):
+        return float(text)
+    return text
+
+
+def paginated_table(source, key, page_size=100):
+    """
+    分页表格组件：排序、单条件过滤、翻页全部在服务端完成，每次只取当前页
+    - source: 快照数据表名称(如 "listening_records")或 DataFrame
+    - key: 组件的唯一前缀，用于区分 session_state
+    """
+    table = _source_table(source)
+    columns = table.column_names
+
+    c1, c2, c3, c4, c5 = st.columns([2, 1, 2, 1, 2])
+    sort_by = c1.selectbox("排序列", ["(不排序)"] + columns, key=f"{key}_sort")
+    ascending = c2.radio("顺序", ["升序", "降序"], key=f"{key}_order") == "升序"
+    filter_col = c3.selectbox("过滤列", ["(不过滤)"] + columns, key=f"{key}_filter_col")
+    filter_op = c4.selectbox("条件", FILTER_OPS, key=f"{key}_filter_op")
+    filter_text = c5.text_input("值", key=f"{key}_filter_value")
+
+    filters = []
+    if filter_col != "(不过滤)" and filter_text != "":
+        try:
+            filters.append((filter_col, filter_op, _parse_value(table, filter_col, filter_text)))
+        except ValueError:
+            st.warning(f"过滤值 {filter_text} 与列 {filter_col} 的类型不匹配，已忽略。")
+
+    # 按当前页码取数据，同时得到总行数以确定页码范围
+    page = st.session_state.get(f"{key}_page", 1)
+    try:
+        df, total = fetch_page(source, page, page_size,
+                               sort_by=None if sort_by == "(不排序)" else sort_by,
+                               ascending=ascending, filters=filters)
+    except (pa.ArrowNotImplementedError, pa.ArrowInvalid) as e:
+        st.warning(f"该列暂不支持此操作: {e}")
+        return
+
+    n_pages = max(math.ceil(total / page_size), 1)
+    if page > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+        st.rerun()
+    st.number_input("页码", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+    st.caption(f"共 {n_pages} 页, {total} 行")
+    st.dataframe(df)
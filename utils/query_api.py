@@ -0,0 +1,180 @@
+# utils/query_api.py
+# 无界面的分析查询接口：与页面共用同一套磁盘缓存/快照，结果按数据版本缓存为 JSON 可序列化对象
+#   from utils import query_api
+#   query_api.query("top_songs", {"n": 10})
+#   query_api.batch([{"name": "cluster_summary", "params": {"k": 4}}, {"name": "regression_r2"}])
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils import analytics, artifact_graph, song_dict
+from utils.single_flight import SingleFlight
+
+# 响应缓存条数
+RESPONSE_CACHE_ENTRIES = 256
+SONG_METRICS = ["records", "total_plays", "listeners", "mean_score"]
+PROVINCE_METRICS = ["total_playlists", "liked_playlist_count", "created_playlist_count",
+                    "fans_count", "follows_count", "level"]
+
+
+class QueryError(ValueError):
+    """查询名或参数不合法"""
+
+
+def _jsonable(obj):
+    """
+    DataFrame / Series / numpy 数组与标量转换为 JSON 可序列化对象；NaN / inf 转为 None(严格 JSON 不允许)
+    """
+    if isinstance(obj, pd.DataFrame):
+        return json.loads(obj.to_json(orient="records", force_ascii=False))
+    if isinstance(obj, pd.Series):
+        return json.loads(obj.to_json(force_ascii=False))
+    if isinstance(obj, np.ndarray):
+        return _jsonable(obj.tolist())
+    if isinstance(obj, np.generic):
+        # 先转为 Python 标量，np.float32 等不是 float 的子类
+        obj = obj.item()
+    if isinstance(obj, dict):
+        return {k: _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+
+# ==========================
+# 查询定义
+# ==========================
+def cluster_summary(k=None):
+    """
+    各聚类在原始特征上的均值及人数；k 为空时使用推荐 K，否则须在 K_RANGE 内
+    """
+    if k is None:
+        k = analytics.recommended_k()
+    elif not analytics.K_RANGE[0] <= k <= analytics.K_RANGE[1]:
+        raise QueryError(f"k 应在 {analytics.K_RANGE[0]}~{analytics.K_RANGE[1]} 之间: {k}")
+    labels, _ = analytics.cluster_users(k)
+    return {"k": k, "clusters": analytics.interpret_clusters(analytics.load_user_features(), labels)}
+
+
+def k_selection():
+    return analytics.k_selection(*analytics.K_RANGE, analytics.SILHOUETTE_SAMPLE)
+
+
+def top_songs(n=20, by="records"):
+    if by not in SONG_METRICS:
+        raise QueryError(f"by 只能是 {SONG_METRICS}")
+    return song_dict.song_stats().nlargest(n, by)
+
+
+def province_averages(metric="total_playlists"):
+    """
+    各省份人均指标，按均值降序
+    """
+    df = analytics.load_playlist_frame()
+    if metric not in PROVINCE_METRICS or metric not in df.columns:
+        raise QueryError(f"metric 只能是 {[m for m in PROVINCE_METRICS if m in df.columns]}")
+    avg = df.groupby("province_name")[metric].agg(["mean", "count"]).dropna()
+    return avg.sort_values("mean", ascending=False).reset_index()
+
+
+def regression_r2():
+    result = analytics.fans_regression()
+    if result is None:
+        raise QueryError("数据列不足: 无法回归粉丝数")
+    return {"r2": result["r2"], "test_size": len(result["y_test"])}
+
+
+# 查询名 -> (函数, 依赖的依赖图节点(决定数据版本), {参数名: 类型})
+QUERIES = {
+    "cluster_summary": (cluster_summary, ["default_clusters"], {"k": int}),
+    "k_selection": (k_selection, ["k_selection"], {}),
+    "top_songs": (top_songs, ["song_stats"], {"n": int, "by": str}),
+    "province_averages": (province_averages, ["playlist_frame"], {"metric": str}),
+    "regression_r2": (regression_r2, ["fans_regression"], {}),
+}
+
+_responses = OrderedDict()
+_lock = threading.Lock()
+_flights = SingleFlight()
+
+
+def _parse_params(name, params):
+    if name not in QUERIES:
+        raise QueryError(f"未知查询: {name}，可用查询: {sorted(QUERIES)}")
+    types = QUERIES[name][2]
+    parsed = {}
+    for key, value in (params or {}).items():
+        if key not in types:
+            raise QueryError(f"查询 {name} 不支持参数 {key}，可用参数: {sorted(types)}")
+        try:
+            parsed[key] = types[key](value)
+        except (TypeError, ValueError):
+            raise QueryError(f"参数 {key} 应为 {types[key].__name__}: {value!r}")
+    return parsed
+
+
+def data_version(name, fingerprints=None):
+    """
+    查询所依赖节点的指纹组合，源数据变化后版本随之变化
+    """
+    fingerprints = fingerprints or artifact_graph.fingerprints()
+    return "-".join(fingerprints[node] for node in QUERIES[name][1])
+
+
+def query(name, params=None, fingerprints=None):
+    """
+    执行单个查询，返回 {"name", "params", "version", "result"}
+    params 为 {参数名: 值} 字典(值可以是字符串，按声明的类型转换)，与查询自身的关键字互不冲突
+    同一 (查询, 参数, 数据版本) 的响应直接复用
+    """
+    params = _parse_params(name, params)
+    version = data_version(name, fingerprints)
+    key = (name, tuple(sorted(params.items())), version)
+    with _lock:
+        if key in _responses:
+            _responses.move_to_end(key)
+            return _responses[key]
+
+    def compute():
+        func = QUERIES[name][0]
+        response = {"name": name, "params": params, "version": version, "result": _jsonable(func(**params))}
+        with _lock:
+            _responses[key] = response
+            while len(_responses) > RESPONSE_CACHE_ENTRIES:
+                _responses.popitem(last=False)
+        return response
+
+    # 并发的相同查询只计算一次，其余请求等待同一结果
+    return _flights.do(key, compute)
+
+
+def batch(queries):
+    """
+    批量查询：queries 为 [{"name": ..., "params": {...}}]，返回等长列表
+    数据版本只计算一次；相同的查询只执行一次；单个查询出错不影响其余查询
+    """
+    fingerprints = artifact_graph.fingerprints()
+    results, seen = [], {}
+    for item in queries:
+        if not isinstance(item, dict):
+            results.append({"ok": False, "name": None, "error": f"查询项应为对象: {item!r}"})
+            continue
+        name, params = item.get("name"), item.get("params") or {}
+        if not isinstance(params, dict):
+            results.append({"ok": False, "name": name, "error": f"params 应为对象: {params!r}"})
+            continue
+        key = json.dumps([name, params], sort_keys=True, ensure_ascii=False, default=str)
+        if key not in seen:
+            try:
+                seen[key] = {"ok": True, **query(name, params, fingerprints=fingerprints)}
+            except QueryError as e:
+                seen[key] = {"ok": False, "name": name, "error": str(e)}
+            except Exception as e:
+                seen[key] = {"ok": False, "name": name, "error": f"查询执行失败: {e}"}
+        results.append(seen[key])
+    return results
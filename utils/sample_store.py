@@ -0,0 +1,327 @@
+# utils/sample_store.py
+# 近似模式用的分层抽样：按 (等级, 省份) 分层，对用户做蓄水池抽样并保留这些用户的全部播放记录，
+# 图表在抽样上按分层权重估计总体，同时给出 95% 置信区间
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils import user_index
+from utils.data_loader import CSV_CHUNK_SIZE, USE_SNAPSHOT, load_sidecar, load_table, table_path
+from utils.disk_cache import disk_cached
+from utils.user_features import FEATURE_COLUMNS
+
+# 每层最多保留的用户数
+SAMPLE_PER_STRATUM = int(os.environ.get("NETEASE_SAMPLE_PER_STRATUM", 50))
+SAMPLE_SEED = 42
+# 95% 置信区间
+Z = 1.96
+SAMPLE_SOURCES = [table_path("basic_info"), table_path("listening_records")]
+USER_COLUMNS = ["user_id", "level", "gender", "province"]
+LISTENING_COLUMNS = ["user_id", "song_name", "playCount", "score"]
+# 抽样用户的用户级指标(只读取抽样用户的行)
+FRAME_COLUMNS = {
+    "playlist_info": ["total_playlists"],
+    "social_info": ["fans_count", "follows_count"],
+}
+FRAME_SOURCES = SAMPLE_SOURCES + [table_path(name) for name in FRAME_COLUMNS]
+
+
+def _stratum(df):
+    return df["level"].astype(str) + "|" + df["province"].astype(str).str[:2]
+
+
+def _reservoir_update(reservoir, chunk, rng, capacity):
+    """
+    每行赋一个随机优先级，各层保留优先级最小的 capacity 行；
+    等价于逐行蓄水池抽样，且可以按块合并，整个过程只扫描一遍数据
+    """
+    chunk = chunk.assign(_key=rng.random(len(chunk)), stratum=_stratum(chunk))
+    merged = chunk if reservoir is None else pd.concat([reservoir, chunk], ignore_index=True)
+    return merged.sort_values("_key").groupby("stratum", sort=False).head(capacity)
+
+
+def reservoir_sample(chunks, capacity=SAMPLE_PER_STRATUM, seed=SAMPLE_SEED):
+    """
+    对逐块到来的基础信息做分层蓄水池抽样，返回抽样用户(USER_COLUMNS + stratum, N_h, n_h, weight)
+    入库时由 snapshot.publish 在解析基础信息的同一趟中调用(见 data_loader.TABLE_SIDECARS)
+    """
+    rng = np.random.default_rng(seed)
+    population = pd.Series(dtype=np.int64)
+    reservoir = None
+    for chunk in chunks:
+        chunk = chunk[USER_COLUMNS]
+        population = population.add(_stratum(chunk).value_counts(), fill_value=0)
+        reservoir = _reservoir_update(reservoir, chunk, rng, capacity)
+    if reservoir is None:
+        return pd.DataFrame({c: [] for c in USER_COLUMNS + ["stratum", "N_h", "n_h", "weight"]})
+
+    users = reservoir.drop(columns="_key").reset_index(drop=True)
+    users["N_h"] = users["stratum"].map(population).astype(np.int64)
+    users["n_h"] = users["stratum"].map(users["stratum"].value_counts()).astype(np.int64)
+    users["weight"] = users["N_h"] / users["n_h"]
+    return users
+
+
+def _indexed_listening(ids):
+    """
+    从按用户排序的播放索引中切出 ids 的全部播放记录：每个用户一段连续行，不扫描整张表
+    """
+    table, index_ids, offsets = user_index.load_index()
+    pos = np.searchsorted(index_ids, ids)
+    hit = pos < len(index_ids)
+    hit[hit] = index_ids[pos[hit]] == ids[hit]
+    pos = pos[hit]
+    starts, lengths = offsets[pos], offsets[pos + 1] - offsets[pos]
+    # 各段 [start, start+length) 拼接成行号数组
+    rows = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    listening = table.select(LISTENING_COLUMNS).take(pa.array(rows, type=pa.int64())).to_pandas()
+    # 抽样规模很小，歌名还原为普通字符串，与 CSV 路径一致
+    listening["song_name"] = listening["song_name"].astype(object)
+    return listening
+
+
+@disk_cached(scope="sample", sources=SAMPLE_SOURCES, name="sample_store.load_sample")
+def load_sample():
+    """
+    返回 {"users": 抽样用户(含 stratum, N_h, n_h, weight), "listening": 其播放记录, "population": 总用户数}
+    使用快照时抽样在基础信息入库时已完成(附属快照 basic_info-<版本>.sample.arrow)，
+    播放记录按用户偏移从排序索引中切片；直接读 CSV 时分块抽样并流式筛选播放记录
+    """
+    if USE_SNAPSHOT:
+        users = load_sidecar("basic_info", "sample")
+        listening = _indexed_listening(np.sort(users["user_id"].to_numpy()))
+    else:
+        users = reservoir_sample(pd.read_csv(table_path("basic_info"), usecols=USER_COLUMNS,
+                                             chunksize=CSV_CHUNK_SIZE))
+        ids = set(users["user_id"])
+        parts = [chunk[chunk["user_id"].isin(ids)]
+                 for chunk in pd.read_csv(table_path("listening_records"), usecols=LISTENING_COLUMNS,
+                                          chunksize=CSV_CHUNK_SIZE)]
+        listening = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=LISTENING_COLUMNS)
+    population = int(users.drop_duplicates("stratum")["N_h"].sum())
+    return {"users": users, "listening": listening, "population": population}
+
+
+@disk_cached(scope="sample", sources=FRAME_SOURCES, name="sample_store.sample_frame")
+def sample_frame():
+    """
+    抽样用户的用户级指标：USER_COLUMNS + 分层字段 + total_plays + FRAME_COLUMNS
+    total_plays 来自抽样用户的全部播放记录(精确)；没有歌单/社交记录的用户对应列为空
+    """
+    sample = load_sample()
+    frame = sample["users"].copy()
+    plays = sample["listening"].groupby("user_id")["playCount"].sum()
+    frame["total_plays"] = frame["user_id"].map(plays).fillna(0)
+    ids = frame["user_id"].tolist()
+    for name, columns in FRAME_COLUMNS.items():
+        right = load_table(name, columns=["user_id", *columns], filters=[("user_id", "in", ids)])
+        frame = pd.merge(frame, right.drop_duplicates("user_id"), on="user_id", how="left")
+    return frame
+
+
+def stratified_totals(users, values):
+    """
+    分层估计总体总量：values 为与 users 行对齐的 DataFrame(每列一个指标)
+    返回 DataFrame(index=指标): estimate | se | low | high
+    方差含有限总体校正 (1 - n_h/N_h)，只有 1 个样本的层方差记为 0
+    """
+    values = values.reset_index(drop=True)
+    grouped = values.groupby(users["stratum"].to_numpy())
+    means = grouped.mean()
+    variances = grouped.var(ddof=1).fillna(0)
+    strata = users.drop_duplicates("stratum").set_index("stratum").loc[means.index]
+    N = strata["N_h"].to_numpy()[:, None]
+    n = strata["n_h"].to_numpy()[:, None]
+
+    estimate = (means.to_numpy() * N).sum(axis=0)
+    se = np.sqrt((N ** 2 * (1 - n / N) * variances.to_numpy() / n).sum(axis=0))
+    return pd.DataFrame({"estimate": estimate, "se": se,
+                         "low": np.maximum(estimate - Z * se, 0), "high": estimate + Z * se},
+                        index=values.columns)
+
+
+def domain_means(users, values, domains):
+    """
+    各子总体(domains 的取值，如等级、省份、聚类)上 values 均值的估计及置信区间
+    values / domains 与 users 行对齐，values 为空的行不参与；比率估计，方差用线性化残差
+    返回 DataFrame(index=子总体): estimate | se | low | high | population(子总体人数估计)
+    """
+    values = pd.Series(np.asarray(values, dtype=np.float64))
+    domains = pd.Series(np.asarray(domains, dtype=object))
+    onehot = pd.get_dummies(domains.where(values.notna() & domains.notna())).astype(np.float64)
+    indicator = onehot.to_numpy()
+    y = values.fillna(0).to_numpy()[:, None] * indicator
+
+    sizes = stratified_totals(users, onehot)["estimate"].to_numpy()
+    totals = stratified_totals(users, pd.DataFrame(y, columns=onehot.columns))["estimate"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = totals / sizes
+        residual = pd.DataFrame(y - indicator * ratio, columns=onehot.columns)
+        se = stratified_totals(users, residual)["se"].to_numpy() / sizes
+    return pd.DataFrame({"estimate": ratio, "se": se, "low": ratio - Z * se, "high": ratio + Z * se,
+                         "population": sizes}, index=onehot.columns)
+
+
+def _per_user(sample, column, keys=None):
+    """
+    抽样用户 × 取值 的计数矩阵(没有记录的用户为 0)，keys 限定列
+    """
+    listening = sample["listening"]
+    if keys is not None:
+        listening = listening[listening[column].isin(keys)]
+    counts = pd.crosstab(listening["user_id"], listening[column])
+    return counts.reindex(sample["users"]["user_id"], fill_value=0)
+
+
+def gender_counts_estimate():
+    """
+    各性别用户数的估计及置信区间(等级、省份是分层变量，其计数在抽样中是精确的)
+    """
+    from utils.analytics import GENDER_MAP
+
+    users = load_sample()["users"]
+    onehot = pd.get_dummies(users["gender"].map(GENDER_MAP).fillna("未知")).astype(np.float64)
+    return stratified_totals(users, onehot).sort_values("estimate", ascending=False)
+
+
+def top_songs_estimate(n=20, candidates=100):
+    """
+    出现次数最多的 n 首歌的估计值及置信区间
+    先按加权出现次数选出 candidates 首候选，再对候选逐首做分层估计
+    """
+    sample = load_sample()
+    users, listening = sample["users"], sample["listening"]
+    weight = listening["user_id"].map(users.set_index("user_id")["weight"])
+    weighted = weight.groupby(listening["song_name"]).sum().nlargest(candidates)
+    counts = _per_user(sample, "song_name", keys=weighted.index).astype(np.float64)
+    return stratified_totals(users, counts).nlargest(n, "estimate")
+
+
+def score_density_estimate(points=256):
+    """
+    抽样记录按用户权重加权的评分分箱核密度，返回与 analytics.score_density 相同的字段，
+    另附平均分的置信区间 mean_low / mean_high(比率估计，线性化方差)
+    """
+    from scipy.ndimage import gaussian_filter1d
+
+    sample = load_sample()
+    users, listening = sample["users"], sample["listening"]
+    rows = listening.dropna(subset=["score"])
+    weight = rows["user_id"].map(users.set_index("user_id")["weight"]).to_numpy()
+    scores = rows["score"].to_numpy(dtype=np.float64)
+    if len(scores) < 2:
+        return {"x": np.array([]), "density": np.array([]), "mean": np.nan, "mean_low": np.nan, "mean_high": np.nan}
+
+    mean = np.average(scores, weights=weight)
+    std = np.sqrt(np.average((scores - mean) ** 2, weights=weight))
+    bandwidth = (std * len(scores) ** (-1 / 5)) or 1.0
+    lo, hi = scores.min() - 3 * bandwidth, scores.max() + 3 * bandwidth
+    counts, edges = np.histogram(scores, bins=points, range=(lo, hi), weights=weight)
+    step = edges[1] - edges[0]
+    smoothed = gaussian_filter1d(counts, sigma=bandwidth / step, mode="constant")
+    density = smoothed / (weight.sum() * step)
+
+    per_user = rows.groupby("user_id")["score"].agg(["sum", "count"]).reindex(users["user_id"], fill_value=0)
+    residual = pd.DataFrame({"z": per_user["sum"].to_numpy() - mean * per_user["count"].to_numpy()})
+    totals = stratified_totals(users, residual)
+    count_total = stratified_totals(users, per_user[["count"]].astype(np.float64))["estimate"].iloc[0]
+    half = Z * totals["se"].iloc[0] / count_total if count_total else np.nan
+    return {"x": (edges[:-1] + edges[1:]) / 2, "density": density, "mean": mean,
+            "mean_low": mean - half, "mean_high": mean + half}
+
+
+def cluster_users_estimate(n_clusters=3):
+    """
+    主页聚类的近似版：抽样用户上按分层权重加权的 K-means + PCA，返回 (labels, X_pca, 聚类汇总)
+    聚类汇总与 analytics.interpret_clusters 同列，为加权估计；另含 user_count_low / user_count_high
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+
+    frame = sample_frame()
+    users = frame[["stratum", "N_h", "n_h"]]
+    X = frame[FEATURE_COLUMNS].fillna(0).to_numpy(dtype=np.float64)
+    labels = KMeans(n_clusters=n_clusters, random_state=42).fit_predict(X, sample_weight=frame["weight"])
+    X_pca = PCA(n_components=2, random_state=42).fit_transform(X)
+
+    summary = pd.DataFrame({m: domain_means(users, X[:, i], labels)["estimate"]
+                            for i, m in enumerate(FEATURE_COLUMNS)})
+    sizes = stratified_totals(users, pd.get_dummies(pd.Series(labels)).astype(np.float64))
+    summary.insert(0, "user_count", sizes["estimate"].round().astype(np.int64))
+    summary["user_count_low"] = sizes["low"].round().astype(np.int64)
+    summary["user_count_high"] = sizes["high"].round().astype(np.int64)
+    summary.index.name = "cluster"
+    return labels, X_pca, summary.reset_index()
+
+
+@disk_cached(scope="sample", sources=FRAME_SOURCES, name="sample_store.social_frame_estimate")
+def social_frame_estimate():
+    """
+    社交页合并数据的抽样版：与 analytics.load_social_frame 一样把数值列的缺失填 0
+    缓存结果在进程内是同一对象，分页表格按对象复用排序结果
+    """
+    frame = sample_frame().copy()
+    for col in ["level", "fans_count", "follows_count", "total_plays", "total_playlists"]:
+        frame[col] = frame[col].fillna(0)
+    return frame
+
+
+def fans_regression_estimate():
+    """
+    粉丝数回归的近似版：抽样用户上按分层权重加权的最小二乘，R² 在测试集上同样加权
+    返回与 analytics.fans_regression 相同的 dict(y_test, y_pred, r2)
+    """
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import r2_score
+    from sklearn.model_selection import train_test_split
+
+    frame = social_frame_estimate()
+    X = frame[["level", "follows_count"]].to_numpy(dtype=np.float64)
+    y = frame["fans_count"].to_numpy(dtype=np.float64)
+    w = frame["weight"].to_numpy()
+    if len(y) < 5:
+        return None
+    X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(X, y, w, random_state=42, test_size=0.2)
+    model = LinearRegression()
+    model.fit(X_train, y_train, sample_weight=w_train)
+    y_pred = model.predict(X_test)
+    return {"y_test": y_test, "y_pred": y_pred, "r2": r2_score(y_test, y_pred, sample_weight=w_test)}
+
+
+def level_playlist_fit_estimate(deg=2):
+    """
+    各等级平均歌单数的分层估计及 95% 置信区间，再对估计值做多项式拟合
+    返回与 analytics.level_playlist_fit 相同的字段，另含 low / high
+    """
+    frame = sample_frame()
+    est = domain_means(frame, frame["total_playlists"], frame["level"]).sort_index()
+    x = est.index.to_numpy(dtype=np.float64)
+    y = est["estimate"].to_numpy()
+    poly_func = np.poly1d(np.polyfit(x, y, deg=deg))
+    x_fit = np.linspace(x.min(), x.max(), 100)
+    return {"x": x, "y": y, "x_fit": x_fit, "y_fit": poly_func(x_fit), "deg": deg,
+            "low": est["low"].to_numpy(), "high": est["high"].to_numpy()}
+
+
+def province_playlist_top10_estimate():
+    """
+    各省份人均歌单数的分层估计，取估计值前 10，返回 province_name | avg_playlists | low | high
+    """
+    from utils.analytics import PROVINCE_MAP
+
+    frame = sample_frame()
+    est = domain_means(frame, frame["total_playlists"], frame["province"].map(PROVINCE_MAP))
+    top10 = est.nlargest(10, "estimate")[["estimate", "low", "high"]].rename(columns={"estimate": "avg_playlists"})
+    top10.index.name = "province_name"
+    return top10.reset_index()
+
+
+def sample_info():
+    """
+    抽样规模：{"users", "population", "records", "strata"}
+    """
+    sample = load_sample()
+    return {"users": len(sample["users"]), "population": sample["population"],
+            "records": len(sample["listening"]), "strata": sample["users"]["stratum"].nunique()}
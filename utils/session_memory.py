@@ -0,0 +1,196 @@
+# utils/session_memory.py
+# 会话级内存统计：记录每个会话本次运行用到的数据表、缓存条目、图表及 session_state 中的大对象
+# 只统计与展示，不做清理：大头是各会话共用的快照与进程缓存，会话自身持有的对象很少
+# 进程指标写入 METRICS_DIR/<pid>.json，由 JSON 查询服务(api_server.py 的 /metrics)汇总给运维查看
+import os
+import sys
+import json
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils import disk_cache
+
+# 超过该时长未活动的会话不再计入进程指标
+SESSION_TTL = 3600
+# 各 Streamlit 进程的指标文件目录
+METRICS_DIR = os.path.join(disk_cache.CACHE_DIR, "metrics")
+
+# frames(共享快照)与 cache(进程级缓存)由全部会话共用，figures 展示后即关闭，只有 session_state 由会话持有
+KINDS = ["frames", "cache", "figures", "session_state"]
+_STATE_KEY = "_memory_usage"
+
+# 进程内全部会话最近一次运行的统计：{session_id: (时间戳, {kind: 字节数})}
+_sessions = {}
+_lock = threading.Lock()
+
+
+def estimate_bytes(obj):
+    """
+    估算对象占用的字节数(DataFrame 不做 deep 统计，字符串列按指针计)
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, plt.Figure):
+        # 以 RGBA 画布缓冲区估算
+        width, height = obj.get_size_inches()
+        return int(width * height * obj.dpi ** 2 * 4)
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_bytes(o) for o in obj)
+    if isinstance(obj, dict):
+        return sum(estimate_bytes(v) for v in obj.values())
+    return sys.getsizeof(obj)
+
+
+def _current_usage():
+    if get_script_run_ctx() is None:
+        return None
+    return st.session_state.get(_STATE_KEY)
+
+
+def _on_access(kind, name, value):
+    usage = _current_usage()
+    if usage is not None:
+        usage[kind][name] = estimate_bytes(value)
+
+
+disk_cache.add_access_hook(_on_access)
+
+
+def begin_run():
+    """
+    每次脚本运行开始时调用，重置本次运行的统计
+    """
+    st.session_state[_STATE_KEY] = {kind: {} for kind in KINDS}
+
+
+def show_figure(fig):
+    """
+    把 matplotlib 图交给 Streamlit 后立即关闭，避免 pyplot 全局持有图对象
+    """
+    usage = _current_usage()
+    if usage is not None:
+        name = f"figure_{len(usage['figures']) + 1}"
+        usage["figures"][name] = estimate_bytes(fig)
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+def end_run():
+    """
+    每次脚本运行结束时调用(放在 finally 中，st.rerun / st.stop / 页面异常时也会执行)：
+    汇总统计、登记到进程指标并写出指标文件，在侧边栏展示
+    """
+    usage = _current_usage()
+    if usage is None:
+        return
+
+    for key, value in st.session_state.items():
+        if key != _STATE_KEY and isinstance(value, (pd.DataFrame, pd.Series, np.ndarray, plt.Figure)):
+            usage["session_state"][key] = estimate_bytes(value)
+
+    totals = {kind: sum(usage[kind].values()) for kind in KINDS}
+    session_id = get_script_run_ctx().session_id
+    now = time.time()
+    with _lock:
+        _sessions[session_id] = (now, totals)
+        for sid in [s for s, (ts, _) in _sessions.items() if now - ts > SESSION_TTL]:
+            del _sessions[sid]
+    metrics = process_metrics()
+    _write_metrics(metrics)
+
+    with st.sidebar.expander("📦 内存占用"):
+        labels = {"frames": "数据表(共享)", "cache": "缓存条目(共享)", "figures": "图表(展示后关闭)",
+                  "session_state": "会话对象"}
+        for kind in KINDS:
+            st.write(f"{labels[kind]}: {totals[kind] / 2**20:.2f} MB")
+        st.write(f"活跃会话数: {metrics['sessions']}")
+        st.write(f"未关闭图表数: {metrics['open_figures']}")
+        if metrics["rss_bytes"] is not None:
+            st.write(f"进程 RSS: {metrics['rss_bytes'] / 2**20:.1f} MB")
+
+
+def process_metrics():
+    """
+    进程级指标：各会话最近一次运行的内存统计、未关闭的图表数、进程 RSS
+    """
+    with _lock:
+        per_session = {sid: dict(totals) for sid, (_, totals) in _sessions.items()}
+    return {
+        "pid": os.getpid(),
+        "updated": time.time(),
+        "sessions": len(per_session),
+        "per_session": per_session,
+        "open_figures": len(plt.get_fignums()),
+        "rss_bytes": _rss_bytes(),
+    }
+
+
+def _write_metrics(metrics):
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # 指标只是观测用途，写不出不影响页面
+
+
+def all_process_metrics():
+    """
+    汇总全部 Streamlit 进程最近写出的指标 {pid: 指标}；已退出进程的文件一并删除
+    """
+    result = {}
+    if not os.path.isdir(METRICS_DIR):
+        return result
+    for file_name in os.listdir(METRICS_DIR):
+        pid = file_name[:-len(".json")]
+        if not (file_name.endswith(".json") and pid.isdigit()):
+            continue
+        path = os.path.join(METRICS_DIR, file_name)
+        if not _alive(int(pid)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                result[int(pid)] = json.load(f)
+        except (OSError, ValueError):
+            continue
+    return result
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
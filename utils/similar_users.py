@@ -0,0 +1,72 @@
+# utils/similar_users.py
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from utils.disk_cache import disk_cached
+from utils.user_features import DATA_FILES, FEATURE_COLUMNS, load_user_features
+
+
+@disk_cached(scope="analytics", sources=DATA_FILES, name="similar_users.build_index")
+def build_index():
+    """
+    在标准化后的用户特征矩阵(float32)上建立 KD 树
+    每个数据版本只构建一次，结果随磁盘缓存持久化
+    返回 dict: tree / user_ids(升序) / rows(user_ids 对应的特征行号) / mean / std / features
+    """
+    features = load_user_features()
+    X = features[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    X_std = (X - mean) / std
+
+    user_ids = features["user_id"].to_numpy()
+    order = np.argsort(user_ids, kind="stable")
+    return {
+        "tree": KDTree(X_std, leaf_size=40),
+        "user_ids": user_ids[order],
+        "rows": order,
+        "mean": mean,
+        "std": std,
+        "features": features,
+    }
+
+
+def similar_users(user_ids, k=10):
+    """
+    批量查询与给定用户最相似的 k 个用户(欧氏距离，特征已标准化)
+    - user_ids: 单个 user_id 或列表
+    返回 DataFrame: query_user_id | rank | user_id | distance | 各特征列
+    不存在的 user_id 会被忽略
+    """
+    columns = ["query_user_id", "rank", "user_id", "distance"] + FEATURE_COLUMNS
+    index = build_index()
+    sorted_ids = index["user_ids"]
+    ids = np.atleast_1d(np.asarray(user_ids))
+    if len(sorted_ids) == 0:
+        return pd.DataFrame(columns=columns)
+
+    pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    found = sorted_ids[pos] == ids
+    if not found.any():
+        return pd.DataFrame(columns=columns)
+
+    query_rows = index["rows"][pos[found]]
+    tree = index["tree"]
+    n_points = tree.data.shape[0]
+    # 多取一个，去掉查询用户自身
+    dist, nbr = tree.query(np.asarray(tree.data)[query_rows], k=min(k + 1, n_points))
+
+    features = index["features"]
+    parts = []
+    for q_row, q_id, d_row, n_row in zip(query_rows, ids[found], dist, nbr):
+        keep = n_row != q_row
+        n_row, d_row = n_row[keep][:k], d_row[keep][:k]
+        part = features.iloc[n_row][["user_id"] + FEATURE_COLUMNS].reset_index(drop=True)
+        part.insert(0, "distance", d_row)
+        part.insert(0, "rank", np.arange(1, len(part) + 1))
+        part.insert(0, "query_user_id", q_id)
+        parts.append(part)
+    result = pd.concat(parts, ignore_index=True)
+    return result[columns]
@@ -0,0 +1,64 @@
+# utils/single_flight.py
+# 同键请求合并：多个线程同时请求同一个 (函数, 数据版本, 参数) 时只执行一次计算，其余线程等待并共享结果
+import os
+import threading
+
+# 等待进行中计算的默认超时(秒)，冷启动构建快照、K 值扫描等可能较慢
+DEFAULT_TIMEOUT = float(os.environ.get("NETEASE_SINGLE_FLIGHT_TIMEOUT", 600))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    do(key, fn)：key 没有进行中的计算时由当前线程执行 fn；否则等待那次计算的结果
+    - 计算抛出的异常原样传给所有等待者，且不缓存，下一次请求会重新计算
+    - 等待超过 timeout 抛出 TimeoutError，进行中的计算不受影响
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.value = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.value
+
+        timeout = self.timeout if timeout is None else timeout
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"等待进行中的计算超时({timeout:.0f}s): {key!r}")
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def in_flight(self):
+        """
+        进行中的计算：{key: 等待者数量}
+        """
+        with self._lock:
+            return {key: call.waiters for key, call in self._calls.items()}
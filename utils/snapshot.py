@@ -0,0 +1,284 @@
+# utils/snapshot.py
+import os
+import json
+import time
+import hashlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils.disk_cache import CACHE_DIR, source_digest
+
+# 列式快照目录：优先放在 /dev/shm(内存文件系统)，多个 Streamlit 进程映射同一份文件
+if os.environ.get("NETEASE_SNAPSHOT_DIR"):
+    SNAPSHOT_DIR = os.environ["NETEASE_SNAPSHOT_DIR"]
+elif os.path.isdir("/dev/shm"):
+    SNAPSHOT_DIR = "/dev/shm/netease_snapshot"
+else:
+    SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshot")
+
+# 每个 record batch 的行数，后续按批做列裁剪/行组跳过
+ROW_GROUP_SIZE = 64 * 1024
+# 其他进程正在发布时最多等待的秒数，超时视为锁已失效
+PUBLISH_TIMEOUT = 600
+# 快照文件格式版本，布局变化时递增，旧快照自动失效
+FORMAT_VERSION = 5
+
+# 本进程已映射的快照，避免每次 rerun 重新 mmap
+_attached = {}
+
+# schema 元数据中保存每个 record batch 数值列 min/max 的键
+STATS_KEY = b"netease.batch_stats"
+
+# 支持下推的过滤操作
+_COMPARE = {
+    "==": pc.equal,
+    "!=": pc.not_equal,
+    ">": pc.greater,
+    ">=": pc.greater_equal,
+    "<": pc.less,
+    "<=": pc.less_equal,
+}
+
+
+def source_version(csv_path):
+    """
+    根据 CSV 内容摘要与格式版本计算版本号，CSV 内容变化后会发布新的快照文件(只 touch 不会)
+    """
+    key = (FORMAT_VERSION, source_digest(csv_path))
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_path(name, csv_path, suffix="arrow"):
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{source_version(csv_path)}.{suffix}")
+
+
+def derived_path(name, sources):
+    """
+    由多个源文件派生的快照路径(如用户特征)，版本由各源文件的内容摘要与格式版本决定
+    """
+    key = (FORMAT_VERSION, [source_digest(p) for p in sources])
+    version = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{version}.arrow")
+
+
+def sidecar_path(path, suffix):
+    """
+    主快照 path 的附属快照路径(与主文件同一版本，如 basic_info-<版本>.sample.arrow)
+    """
+    return f"{path[:-len('.arrow')]}.{suffix}.arrow"
+
+
+def write_table(table, path, metadata=None):
+    """
+    以 Arrow IPC(未压缩，可直接 mmap) 格式写出，先写临时文件再原子替换
+    每 ROW_GROUP_SIZE 行一个 record batch，并把各批数值列的 min/max 写入 schema 元数据，
+    读取时据此跳过不可能满足过滤条件的批
+    """
+    batches = table.to_batches(max_chunksize=ROW_GROUP_SIZE)
+    stats = {}
+    for field in table.schema:
+        if not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)):
+            continue
+        col_stats = []
+        for batch in batches:
+            mm = pc.min_max(batch.column(field.name)).as_py()
+            col_stats.append([mm["min"], mm["max"]])
+        stats[field.name] = col_stats
+
+    schema_metadata = {**(table.schema.metadata or {}), **(metadata or {})}
+    schema_metadata[STATS_KEY] = json.dumps(stats).encode("utf-8")
+    schema = table.schema.with_metadata(schema_metadata)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    os.replace(tmp_path, path)
+
+
+def read_table(path):
+    """
+    只读内存映射打开 Arrow 文件，数据页由操作系统在各进程间共享
+    """
+    source = pa.memory_map(path, "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def publish(name, csv_path, build=None, sidecars=None):
+    """
+    确保 csv_path 对应版本的快照已存在，返回快照路径
+    - build: 可选，接收 DataFrame 返回 pa.Table 的转换函数
+    - sidecars: 可选，{后缀: 接收 DataFrame 返回 pa.Table 的函数}，在同一次入库中基于已解析的数据生成附属快照，
+      先于主文件写出(主文件出现即代表附属快照已就绪)，不再单独扫描一遍 CSV
+    """
+    def produce(path):
+        df = pd.read_csv(csv_path)
+        for suffix, make in (sidecars or {}).items():
+            write_table(make(df), sidecar_path(path, suffix))
+        table = build(df) if build else pa.Table.from_pandas(df, preserve_index=False)
+        write_table(table, path)
+        remove_old_versions(name, path)
+
+    return ensure(snapshot_path(name, csv_path), produce)
+
+
+def ensure(path, produce):
+    """
+    确保 path 已存在；不存在时在跨进程锁内调用 produce(path) 生成
+    同一时间只有一个进程负责生成(用 O_EXCL 锁文件互斥)，其余进程等待
+    produce 需最后写出 path 本身，path 出现即代表同批文件全部就绪
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    while not os.path.exists(path):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > PUBLISH_TIMEOUT:
+                    os.remove(lock_path)  # 发布进程异常退出留下的锁
+            except OSError:
+                pass
+            time.sleep(0.2)
+            continue
+
+        try:
+            if not os.path.exists(path):
+                produce(path)
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    return path
+
+
+def attach(name, csv_path, build=None, sidecars=None):
+    """
+    返回 name 对应的 pa.Table(内存映射，只读)
+    CSV 版本变化时自动发布并切换到新快照
+    """
+    return _map(name, publish(name, csv_path, build=build, sidecars=sidecars))
+
+
+def _map(name, path):
+    """
+    映射 path 并缓存在本进程中，同名的旧版本映射一并释放
+    """
+    table = _attached.get(path)
+    if table is None:
+        for key in [k for k in _attached if os.path.basename(k).startswith(f"{name}-")]:
+            del _attached[key]
+        table = read_table(path)
+        _attached[path] = table
+    return table
+
+
+def attach_derived(name, sources, build):
+    """
+    返回派生快照 name 的 pa.Table(内存映射，只读)
+    - build: 无参函数，返回 pa.Table；当前版本的快照不存在时在跨进程锁内调用一次并写出
+    """
+    def produce(path):
+        write_table(build(), path)
+        remove_old_versions(name, path)
+
+    return _map(name, ensure(derived_path(name, sources), produce))
+
+
+def column_range(table, column):
+    """
+    由 schema 元数据中各批的 min/max 得到整列的 (最小值, 最大值)，不扫描数据；全为空值时为 (nan, nan)
+    """
+    raw_stats = (table.schema.metadata or {}).get(STATS_KEY)
+    stats = json.loads(raw_stats).get(column, []) if raw_stats else []
+    lows = [lo for lo, _ in stats if lo is not None]
+    highs = [hi for _, hi in stats if hi is not None]
+    if not lows:
+        return float("nan"), float("nan")
+    return float(min(lows)), float(max(highs))
+
+
+def scan(table, columns=None, filters=None):
+    """
+    在快照上做列裁剪与谓词下推：
+    - columns: 需要的列，None 表示全部
+    - filters: [(列名, 操作, 值), ...]，各条件为"与"关系，操作为 == != > >= < <= in
+    先用每批 min/max 跳过整批，再在剩余批上精确过滤；未过滤时结果仍引用映射内存
+    """
+    filters = list(filters or [])
+    for _, op, _ in filters:
+        if op not in _COMPARE and op != "in":
+            raise ValueError(f"不支持的过滤操作: {op}")
+    if not filters:
+        return table.select(columns) if columns else table
+
+    batches = table.to_batches()
+    raw_stats = (table.schema.metadata or {}).get(STATS_KEY)
+    stats = json.loads(raw_stats) if raw_stats else {}
+    keep = [i for i in range(len(batches)) if _batch_may_match(stats, i, filters)]
+
+    filter_cols = [col for col, _, _ in filters]
+    if columns:
+        read_cols = list(columns) + [c for c in filter_cols if c not in columns]
+    else:
+        read_cols = table.column_names
+    schema = pa.schema([table.schema.field(c) for c in read_cols])
+    subset = pa.Table.from_batches([batches[i].select(read_cols) for i in keep], schema=schema)
+
+    mask = None
+    for col, op, value in filters:
+        if op == "in":
+            cond = pc.is_in(subset[col], value_set=pa.array(list(value)))
+        else:
+            cond = _COMPARE[op](subset[col], value)
+        mask = cond if mask is None else pc.and_(mask, cond)
+    subset = subset.filter(mask)
+    return subset.select(columns) if columns else subset
+
+
+def _batch_may_match(stats, index, filters):
+    for col, op, value in filters:
+        if col not in stats:
+            continue
+        lo, hi = stats[col][index]
+        if lo is None:  # 整批为空值
+            return False
+        if op == "==" and not (lo <= value <= hi):
+            return False
+        if op == ">" and hi <= value:
+            return False
+        if op == ">=" and hi < value:
+            return False
+        if op == "<" and lo >= value:
+            return False
+        if op == "<=" and lo > value:
+            return False
+        if op == "in" and not any(lo <= v <= hi for v in value):
+            return False
+    return True
+
+
+def to_pandas(table):
+    """
+    转为 DataFrame；split_blocks 让无空值的数值列直接引用映射内存而不复制
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def remove_old_versions(name, current_path):
+    """
+    删除 name 的其他版本文件(含 .arrow 及附带的索引文件)
+    """
+    current_prefix = os.path.basename(current_path).split(".")[0] + "."
+    for file_name in os.listdir(SNAPSHOT_DIR):
+        if file_name.startswith(f"{name}-") and not file_name.startswith(current_prefix) \
+                and not file_name.endswith((".lock", ".tmp")):
+            try:
+                # 其他进程仍映射着旧文件也没关系，unlink 后映射在其解除前一直有效
+                os.remove(os.path.join(SNAPSHOT_DIR, file_name))
+            except OSError:
+                pass
@@ -0,0 +1,82 @@
+# utils/song_dict.py
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from utils import mapreduce
+from utils.data_loader import USE_SNAPSHOT, attach_table, load_table, table_path
+from utils.disk_cache import disk_cached
+
+# 进程内的前缀索引：(歌曲聚合表 id, 歌名列表)
+_name_index = {}
+
+
+def _song_names(table):
+    """
+    快照中 song_name 的共享字典，下标即 song_id
+    """
+    column = table["song_name"]
+    return column.chunk(0).dictionary.to_pylist() if column.num_chunks else []
+
+
+@disk_cached(scope="analytics", sources=[table_path("listening_records")], name="song_dict.song_stats", version=2)
+def song_stats():
+    """
+    每首歌的聚合指标，行号即 song_id(歌名字典序):
+        song_id | song_name | records | total_plays | mean_score | listeners
+    records 为出现在播放记录中的条数，listeners 为去重后的听众数
+    全部基于整数编码用 bincount 计算，不再对歌名字符串做哈希；map 任务见 utils/mapreduce.py
+    """
+    if USE_SNAPSHOT:
+        # 按用户分区并行累计，各分区共享歌名字典，结果按 song_id 对齐相加
+        names = _song_names(attach_table("listening_records"))
+        totals = mapreduce.run("song_totals")
+    else:
+        # 不使用快照时直接读 CSV：按字典序编号后在本进程内累计，不发布快照也不构建排序索引
+        df = load_table("listening_records", columns=["user_id", "song_name", "playCount", "score"])
+        codes, uniques = pd.factorize(df["song_name"], sort=True)
+        names = uniques.astype(str).tolist()
+        totals = mapreduce.song_totals_of(codes, df["playCount"].to_numpy(), df["score"].to_numpy(),
+                                          df["user_id"].to_numpy(), len(names))
+    if totals is None:
+        # 没有任何播放记录(全部分区为空)
+        totals = mapreduce.SongTotals(*(np.zeros(len(names)) for _ in mapreduce.SongTotals._fields))
+    records, total_plays, score_sum, score_cnt, listeners = totals
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_score = np.where(score_cnt > 0, score_sum / score_cnt, np.nan)
+
+    return pd.DataFrame({
+        "song_id": np.arange(len(names), dtype=np.int32),
+        "song_name": names,
+        "records": records.astype(np.int64),
+        "total_plays": total_plays.astype(np.int64),
+        "mean_score": mean_score,
+        "listeners": listeners.astype(np.int64),
+    })
+
+
+def top_songs(n=20, by="records"):
+    """
+    返回播放记录中出现最多的 n 首歌: Series(index=歌名, values=指标)
+    """
+    stats = song_stats()
+    return stats.nlargest(n, by).set_index("song_name")[by]
+
+
+def search_prefix(prefix, limit=20):
+    """
+    前缀查找：歌名按字典序编号，二分定位 [prefix, prefix+\U0010ffff) 区间，
+    结果按出现次数降序，最多返回 limit 条
+    """
+    stats = song_stats()
+    cached = _name_index.get("names")
+    if cached is None or cached[0] is not stats:
+        cached = (stats, stats["song_name"].tolist())
+        _name_index["names"] = cached
+    names = cached[1]
+
+    lo = bisect.bisect_left(names, prefix)
+    hi = bisect.bisect_left(names, prefix + "\U0010ffff")
+    return stats.iloc[lo:hi].nlargest(limit, "records").reset_index(drop=True)
@@ -0,0 +1,56 @@
+# utils/user_features.py
+import pandas as pd
+import pyarrow as pa
+
+from utils import mapreduce, snapshot
+from utils.data_loader import USE_SNAPSHOT, load_table, table_path
+from utils.disk_cache import disk_cached
+
+# 每个用户的特征向量(主页聚类、相似用户检索共用)
+FEATURE_COLUMNS = ["level", "total_plays", "total_playlists", "fans_count", "follows_count"]
+
+# 构建特征只需要以下列，读取时直接裁剪
+REQUIRED_COLUMNS = {
+    "basic_info": ["user_id", "level"],
+    "listening_records": ["user_id", "playCount"],
+    "playlist_info": ["user_id", "total_playlists"],
+    "social_info": ["user_id", "fans_count", "follows_count"],
+}
+DATA_FILES = [table_path(name) for name in REQUIRED_COLUMNS]
+
+
+@disk_cached(scope="analytics", sources=DATA_FILES, name="user_features.load_user_features")
+def load_user_features():
+    """
+    合并四张表，返回 user_id + FEATURE_COLUMNS，缺失值填 0
+    读取失败时抛出异常，由调用方决定如何提示
+    """
+    basic = load_table("basic_info", columns=REQUIRED_COLUMNS["basic_info"])
+    playlist = load_table("playlist_info", columns=REQUIRED_COLUMNS["playlist_info"])
+    social = load_table("social_info", columns=REQUIRED_COLUMNS["social_info"])
+
+    if USE_SNAPSHOT:
+        # 播放记录是最大的表，按用户分区后在进程池上并行求和
+        listen_agg = mapreduce.run("user_plays")
+    else:
+        listen = load_table("listening_records", columns=REQUIRED_COLUMNS["listening_records"])
+        listen_agg = listen.groupby("user_id", as_index=False)["playCount"].sum()
+        listen_agg.rename(columns={"playCount": "total_plays"}, inplace=True)
+
+    merged = pd.merge(basic[["user_id", "level"]], listen_agg, on="user_id", how="left")
+    merged = pd.merge(merged, playlist[["user_id", "total_playlists"]], on="user_id", how="left")
+    merged = pd.merge(merged, social[["user_id", "fans_count", "follows_count"]], on="user_id", how="left")
+
+    for col in FEATURE_COLUMNS:
+        merged[col] = merged[col].fillna(0)
+
+    return merged
+
+
+def attach_user_features():
+    """
+    用户特征的派生 Arrow 快照(内存映射，每批带 min/max 统计)，版本由四个源文件的内容摘要决定
+    需要逐块扫描全部用户的计算(如二维分箱)直接读取其 record batch，不在进程中展开整张特征表
+    """
+    return snapshot.attach_derived("user_features", DATA_FILES,
+                                   lambda: pa.Table.from_pandas(load_user_features(), preserve_index=False))
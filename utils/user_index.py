@@ -0,0 +1,97 @@
+# utils/user_index.py
+import numpy as np
+import pyarrow.compute as pc
+
+from utils import snapshot
+from utils.data_loader import USE_SNAPSHOT, attach_table, load_table, table_path
+
+INDEX_NAME = "listening_by_user"
+
+# 本进程已加载的索引：{arrow路径: (pa.Table, user_ids, offsets)}
+_loaded = {}
+
+
+def _index_files(path):
+    base = path[:-len(".arrow")]
+    return f"{base}.ids.npy", f"{base}.offsets.npy"
+
+
+def _build_index(path):
+    """
+    按 user_id 排序后的播放记录 + 偏移索引：
+    ids[i] 的记录位于排序表的 [offsets[i], offsets[i+1]) 行
+    """
+    table = attach_table("listening_records")
+    order = pc.sort_indices(table, sort_keys=[("user_id", "ascending")])
+    sorted_table = table.take(order)
+
+    user_col = sorted_table["user_id"].to_numpy()
+    ids, starts = np.unique(user_col, return_index=True)
+    offsets = np.append(starts, len(user_col)).astype(np.int64)
+
+    ids_path, offsets_path = _index_files(path)
+    np.save(ids_path, ids)
+    np.save(offsets_path, offsets)
+    # 最后写出 arrow 文件，它出现即代表索引已完整
+    snapshot.write_table(sorted_table, path)
+    snapshot.remove_old_versions(INDEX_NAME, path)
+
+
+def index_path():
+    """
+    当前播放记录版本对应的排序索引文件路径，不存在时先构建
+    分区聚合(utils/mapreduce.py)的各子进程直接映射该文件并按偏移切片
+    """
+    path = snapshot.snapshot_path(INDEX_NAME, table_path("listening_records"))
+    return snapshot.ensure(path, _build_index)
+
+
+def offsets_of(path):
+    return np.load(_index_files(path)[1], mmap_mode="r")
+
+
+def load_index():
+    """
+    返回 (按 user_id 排序的 pa.Table, user_ids, offsets)，三者都以内存映射方式只读打开
+    """
+    path = snapshot.snapshot_path(INDEX_NAME, table_path("listening_records"))
+    cached = _loaded.get(path)
+    if cached is None:
+        index_path()
+        ids_path, offsets_path = _index_files(path)
+        cached = (
+            snapshot.read_table(path),
+            np.load(ids_path, mmap_mode="r"),
+            np.load(offsets_path, mmap_mode="r"),
+        )
+        _loaded.clear()
+        _loaded[path] = cached
+    return cached
+
+
+def user_listening_records(user_id, columns=None):
+    """
+    取某个用户的全部播放记录：二分查找偏移 + 连续切片，不扫描整张表
+    不使用快照时直接按 user_id 过滤 CSV(分块读取)
+    """
+    if not USE_SNAPSHOT:
+        return load_table("listening_records", columns=columns, filters=[("user_id", "==", user_id)])
+    table, ids, offsets = load_index()
+    i = int(np.searchsorted(ids, user_id))
+    if i >= len(ids) or ids[i] != user_id:
+        start, end = 0, 0
+    else:
+        start, end = int(offsets[i]), int(offsets[i + 1])
+
+    part = table.slice(start, end - start)
+    if columns:
+        part = part.select(columns)
+    return snapshot.to_pandas(part)
+
+
+def has_user(user_id):
+    if not USE_SNAPSHOT:
+        return not user_listening_records(user_id, columns=["user_id"]).empty
+    _, ids, _ = load_index()
+    i = int(np.searchsorted(ids, user_id))
+    return i < len(ids) and ids[i] == user_id
@@ -0,0 +1,76 @@
+# utils/warmup.py
+# 服务启动预热：后台线程按派生数据依赖图(utils/artifact_graph.py)发布共享快照，并预先计算各页面默认参数下的缓存结果
+import time
+import threading
+
+from utils import artifact_graph
+
+_lock = threading.Lock()
+_state = {"started": None, "finished": None, "running": [], "done": [], "failed": {}}
+_thread = None
+
+
+def _label(node):
+    return f"{node.page} · {node.label or node.name}"
+
+
+def _on_event(kind, node, detail=None):
+    label = _label(node)
+    with _lock:
+        if kind == "start":
+            _state["running"].append(label)
+            return
+        if label in _state["running"]:
+            _state["running"].remove(label)
+        if kind == "done":
+            _state["done"].append(label)
+        else:
+            # 单个节点失败不影响其余预热，页面访问时会按原逻辑重新计算并提示错误
+            _state["failed"][label] = detail or "上游节点失败，已跳过"
+
+
+def _run():
+    # 按依赖图拓扑顺序并行执行全部节点；磁盘缓存已是最新的节点只是载入内存，很快完成
+    try:
+        artifact_graph.rebuild(force=True, on_event=_on_event)
+    finally:
+        with _lock:
+            _state["finished"] = time.time()
+
+
+def start():
+    """
+    启动预热(每个进程只启动一次，重复调用直接返回)
+    """
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _state["started"] = time.time()
+        _thread = threading.Thread(target=_run, name="netease-warmup", daemon=True)
+        _thread.start()
+
+
+def readiness():
+    """
+    预热进度：{"ready", "total", "done", "failed", "current", "elapsed"}，current 为正在执行的节点
+    """
+    with _lock:
+        started, finished = _state["started"], _state["finished"]
+        return {
+            "ready": finished is not None,
+            "total": len(artifact_graph.NODES),
+            "done": list(_state["done"]),
+            "failed": dict(_state["failed"]),
+            "current": "、".join(_state["running"]) or None,
+            "elapsed": None if started is None else (finished or time.time()) - started,
+        }
+
+
+def wait(timeout=None):
+    """
+    阻塞直到预热结束，返回是否已完成(命令行脚本、压测等使用)
+    """
+    start()
+    _thread.join(timeout)
+    return not _thread.is_alive()